@@ -0,0 +1,4 @@
+"""Benchmarks for the HTML catalogers in public/converter.
+
+sitegen builds deterministic synthetic sites; harness times the cataloger on them.
+"""
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Cataloger Benchmark Harness
+Times each phase of html_section_cataloger_deluxe.py on synthetic sites of several sizes
+and saves the numbers as JSON, so two commits can be compared with --compare.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+import tracemalloc
+from pathlib import Path
+from contextlib import redirect_stdout
+
+from benchmarks.sitegen import (generate_site, DEFAULT_SECTIONS_PER_PAGE, DEFAULT_DEPTH,
+                                DEFAULT_VOCABULARY, DEFAULT_DUPLICATE_RATIO, DEFAULT_SEED)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONVERTER_DIR = REPO_ROOT / 'public' / 'converter'
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_SITES_DIR = REPO_ROOT / '.bench-sites'
+# analyze_section_content() is timed on the sections of this many pages
+ANALYZE_SAMPLE_PAGES = 200
+# Phases slower than this ratio in --compare are flagged, unless both runs are too short to tell
+REGRESSION_RATIO = 1.10
+MIN_COMPARED_SECONDS = 0.05
+
+def load_cataloger():
+    """Import the section cataloger from public/converter (it's a standalone script, not a package)."""
+    if str(CONVERTER_DIR) not in sys.path:
+        sys.path.insert(0, str(CONVERTER_DIR))
+    import html_section_cataloger_deluxe
+    return html_section_cataloger_deluxe
+
+def git_revision():
+    """Current commit of the repo (with '+dirty' for uncommitted changes), or None outside git."""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ('+dirty' if dirty else '')
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def timed(phases, name, function, *args, trace_memory=False, **kwargs):
+    """Run function, record its wall time and the peak RSS so far under phases[name], return its result.
+    
+    The peak RSS is the process's high-water mark, so it includes every earlier phase; it only
+    tells a phase's own peak when that is the highest yet. tracemalloc slows Python code down
+    several times over, so with trace_memory the phase's own peak allocation is measured in a
+    second, separate run rather than during the timed one.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    phases[name] = {'seconds': round(seconds, 4), 'peak_rss_so_far_bytes': peak_rss_bytes()}
+    
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            function(*args, **kwargs)
+            phases[name]['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+def run_size(site_directory, pages, options):
+    """Benchmark every phase on one site; meant to run in its own process so peak RSS is per size."""
+    cataloger = load_cataloger()
+    manifest = generate_site(site_directory, pages, options['sections'], options['depth'],
+                             options['vocabulary'], options['duplicates'], options['seed'])
+    phases = {}
+    
+    html_files = timed(phases, 'walk', lambda: list(cataloger.walk_html_files(site_directory)))
+    
+    def parse_all():
+        for html_file in html_files:
+            cataloger.parse_html_file(html_file, options['parser'])
+    timed(phases, 'parse_html_file', parse_all)
+    
+    # analyze_section_content() on its own, over already-parsed sections
+    sections = []
+    for html_file in html_files[:ANALYZE_SAMPLE_PAGES]:
+        with open(html_file, 'rb') as f:
+            text, _ = cataloger.decode_html(f.read())
+        sections.extend(cataloger.parse_document(text, options['parser']).find_all('section'))
+    
+    def analyze_all():
+        for section in sections:
+            cataloger.analyze_section_content(section)
+    timed(phases, 'analyze_section_content', analyze_all)
+    phases['analyze_section_content']['sections'] = len(sections)
+    
+    # The full pipeline as the CLI runs it, with its per-file output swallowed
+    with redirect_stdout(io.StringIO()):
+        unique_sections = timed(phases, 'catalog_sections', cataloger.catalog_sections, site_directory,
+                                trace_memory=options['trace_memory'], jobs=options['jobs'],
+                                parser=options['parser'], html_files=html_files)
+    
+    report_path = os.path.join(site_directory, os.pardir, f"report-{pages}.md")
+    json_path = os.path.join(site_directory, os.pardir, f"catalog-{pages}.json")
+    with redirect_stdout(io.StringIO()):
+        timed(phases, 'report', cataloger.display_results, unique_sections, show_details=True,
+              output_file=report_path, quiet=True)
+        timed(phases, 'save_to_json', cataloger.save_to_json, unique_sections, json_path)
+    os.remove(report_path)
+    os.remove(json_path)
+    
+    catalog_seconds = phases['catalog_sections']['seconds']
+    return {
+        'pages': pages,
+        'files': len(html_files),
+        'bytes': manifest['total_bytes'],
+        'sections': manifest['total_sections'],
+        'unique_structures': len(unique_sections),
+        'files_per_second': round(len(html_files) / catalog_seconds, 1) if catalog_seconds else None,
+        'bytes_per_second': round(manifest['total_bytes'] / catalog_seconds) if catalog_seconds else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'phases': phases
+    }
+
+def run_benchmarks(sizes, sites_directory, options):
+    """Run each size in a fresh interpreter and collect the results."""
+    results = []
+    for pages in sizes:
+        site_directory = os.path.join(sites_directory, f"site-{pages}-seed{options['seed']}")
+        print(f"Benchmarking {pages} pages ({site_directory})...")
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.harness', '--run-one', site_directory, str(pages),
+             json.dumps(options)],
+            cwd=REPO_ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"Error: benchmark for {pages} pages failed:\n{completed.stderr}")
+            continue
+        result = json.loads(completed.stdout)
+        results.append(result)
+        print(f"  {result['files']} files in {result['phases']['catalog_sections']['seconds']}s "
+              f"({result['files_per_second']} files/sec), peak RSS {result['peak_rss_bytes'] / 1048576:.1f} MiB")
+    return results
+
+def compare_results(old_path, new_path):
+    """Print per-phase timing ratios between two result files, flagging regressions."""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    
+    print(f"Comparing {old.get('revision')} -> {new.get('revision')}")
+    old_by_pages = {result['pages']: result for result in old['results']}
+    regressions = 0
+    for result in new['results']:
+        previous = old_by_pages.get(result['pages'])
+        if previous is None:
+            continue
+        print(f"\n{result['pages']} pages:")
+        for phase, numbers in result['phases'].items():
+            if phase not in previous['phases']:
+                continue
+            before = previous['phases'][phase]['seconds']
+            after = numbers['seconds']
+            ratio = after / before if before else float('inf')
+            slower = ratio > REGRESSION_RATIO and max(before, after) >= MIN_COMPARED_SECONDS
+            flag = '  <-- slower' if slower else ''
+            regressions += bool(flag)
+            print(f"  {phase:<24} {before:>9.3f}s -> {after:>9.3f}s  x{ratio:.2f}{flag}")
+        print(f"  {'peak RSS':<24} {previous['peak_rss_bytes'] / 1048576:>8.1f}M -> "
+              f"{result['peak_rss_bytes'] / 1048576:>8.1f}M")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the section cataloger on synthetic sites')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                       help=f'Site sizes in pages (default: {" ".join(map(str, DEFAULT_SIZES))})')
+    parser.add_argument('--output', '-o', default=None,
+                       help='Results JSON file (default: bench-<revision>.json)')
+    parser.add_argument('--sites-dir', default=str(DEFAULT_SITES_DIR),
+                       help='Where generated sites are kept and reused between runs (default: .bench-sites)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Worker processes for catalog_sections (default: 1)')
+    parser.add_argument('--parser', '-p', default='html.parser',
+                       help='HTML parser backend to benchmark (default: html.parser)')
+    parser.add_argument('--sections', type=int, default=DEFAULT_SECTIONS_PER_PAGE,
+                       help=f'Average sections per page (default: {DEFAULT_SECTIONS_PER_PAGE})')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH,
+                       help=f'Maximum nesting depth inside a section (default: {DEFAULT_DEPTH})')
+    parser.add_argument('--vocabulary', type=int, default=DEFAULT_VOCABULARY,
+                       help=f'Number of distinct class names (default: {DEFAULT_VOCABULARY})')
+    parser.add_argument('--duplicates', type=float, default=DEFAULT_DUPLICATE_RATIO,
+                       help=f'Share of repeated sections, 0-1 (default: {DEFAULT_DUPLICATE_RATIO})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                       help=f'Random seed for the generated sites (default: {DEFAULT_SEED})')
+    parser.add_argument('--trace-memory', action='store_true',
+                       help='Also measure the peak Python allocation of catalog_sections with tracemalloc (slow)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                       help='Compare two results files instead of running (exit code 1 on regressions)')
+    parser.add_argument('--run-one', nargs=3, help=argparse.SUPPRESS)
+    
+    args = parser.parse_args()
+    
+    if args.run_one:
+        # Anything the cataloger prints goes to stderr; stdout carries only the result
+        site_directory, pages, options = args.run_one
+        with redirect_stdout(sys.stderr):
+            result = run_size(site_directory, int(pages), json.loads(options))
+        print(json.dumps(result))
+        return
+    
+    if args.compare:
+        sys.exit(1 if compare_results(*args.compare) else 0)
+    
+    options = {
+        'jobs': args.jobs,
+        'parser': args.parser,
+        'sections': args.sections,
+        'depth': args.depth,
+        'vocabulary': args.vocabulary,
+        'duplicates': args.duplicates,
+        'seed': args.seed,
+        'trace_memory': args.trace_memory
+    }
+    revision = git_revision()
+    results = run_benchmarks(args.sizes, args.sites_dir, options)
+    
+    output_file = args.output or f"bench-{revision or 'local'}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'revision': revision,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': options,
+            'results': results
+        }, f, indent=2)
+    print(f"\nResults saved to: {output_file}")
+
+if __name__ == "__main__":
+    main()
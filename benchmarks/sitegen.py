@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Synthetic Site Generator
+Builds a deterministic fake static site for benchmarking the catalogers.
+The same parameters and seed always produce byte-identical files.
+"""
+
+import os
+import json
+import random
+import argparse
+from pathlib import Path
+
+DEFAULT_SEED = 1
+DEFAULT_SECTIONS_PER_PAGE = 6
+DEFAULT_DEPTH = 5
+DEFAULT_VOCABULARY = 40
+DEFAULT_DUPLICATE_RATIO = 0.6
+# Pages per folder, and folders per level, so big sites get a realistic tree instead of one flat dir
+PAGES_PER_FOLDER = 50
+FOLDERS_PER_LEVEL = 20
+
+MANIFEST_FILE = 'sitegen.json'
+
+CHILD_TAGS = ['div', 'div', 'div', 'p', 'p', 'a', 'span', 'img', 'ul', 'li', 'h2', 'h3', 'button', 'input']
+VOID_TAGS = {'img', 'input'}
+CLASS_STEMS = ['hero', 'feature', 'product', 'benefit', 'card', 'grid', 'gallery', 'pricing',
+               'testimonial', 'cta', 'faq', 'team', 'stats', 'contact', 'banner', 'media']
+CLASS_SUFFIXES = ['section', 'block', 'wrapper', 'row', 'col', 'inner', 'item', 'container']
+
+def class_vocabulary(size, rng):
+    """`size` distinct class names built from the stems and suffixes (numbered once those run out)."""
+    names = [f"{stem}-{suffix}" for stem in CLASS_STEMS for suffix in CLASS_SUFFIXES]
+    rng.shuffle(names)
+    while len(names) < size:
+        names.append(f"{rng.choice(CLASS_STEMS)}-{len(names)}")
+    return names[:size]
+
+def random_element(rng, vocabulary, depth, max_depth):
+    """Random element subtree, up to max_depth levels below this one."""
+    tag = rng.choice(CHILD_TAGS)
+    attributes = ''
+    classes = rng.sample(vocabulary, rng.randint(0, 2))
+    if classes:
+        attributes += f' class="{" ".join(classes)}"'
+    if tag == 'img':
+        attributes += f' src="/img/{rng.randint(0, 999)}.png" loading="lazy"'
+    elif tag == 'input':
+        attributes += ' type="text"'
+    elif tag == 'button' and rng.random() < 0.5:
+        attributes += ' role="button"'
+    if tag in VOID_TAGS:
+        return f'<{tag}{attributes}>'
+    
+    if depth < max_depth and rng.random() < 0.7:
+        inner = ''.join(random_element(rng, vocabulary, depth + 1, max_depth) for _ in range(rng.randint(1, 3)))
+    else:
+        inner = f'Lorem ipsum {rng.randint(0, 99999)}'
+    return f'<{tag}{attributes}>{inner}</{tag}>'
+
+def random_section(rng, vocabulary, max_depth):
+    """Random <section> (or section-classed <div>), occasionally with a nested section inside."""
+    section_classes = [rng.choice(vocabulary)] + rng.sample(vocabulary, rng.randint(0, 2))
+    tag = 'section' if rng.random() < 0.8 else 'div'
+    if tag == 'div':
+        section_classes.append('content-section')
+    
+    children = [random_element(rng, vocabulary, 1, max_depth) for _ in range(rng.randint(2, 6))]
+    if max_depth > 1 and rng.random() < 0.1:
+        children.insert(rng.randint(0, len(children)), random_section(rng, vocabulary, max_depth - 1))
+    return f'<{tag} class="{" ".join(section_classes)}">{"".join(children)}</{tag}>'
+
+def page_path(index):
+    """Relative path of page `index`, spreading pages over a folder tree."""
+    folder = index // PAGES_PER_FOLDER
+    parts = []
+    while folder:
+        folder, digit = divmod(folder - 1, FOLDERS_PER_LEVEL)
+        parts.append(f"d{digit}")
+    name = 'index.html' if index % PAGES_PER_FOLDER == 0 else f"page-{index}.html"
+    return Path(*reversed(parts), name)
+
+def generate_site(root_directory, pages, sections_per_page=DEFAULT_SECTIONS_PER_PAGE, depth=DEFAULT_DEPTH,
+                  vocabulary_size=DEFAULT_VOCABULARY, duplicate_ratio=DEFAULT_DUPLICATE_RATIO, seed=DEFAULT_SEED):
+    """Write a synthetic site to root_directory and return its manifest.
+    
+    duplicate_ratio is the share of sections copied verbatim from a pool of earlier ones, the
+    way real sites repeat the same hero or footer markup across pages. If root_directory already
+    holds a site generated with the same parameters it is reused as is.
+    """
+    root_path = Path(root_directory)
+    manifest = {
+        'pages': pages,
+        'sections_per_page': sections_per_page,
+        'depth': depth,
+        'vocabulary': vocabulary_size,
+        'duplicate_ratio': duplicate_ratio,
+        'seed': seed
+    }
+    manifest_path = root_path / MANIFEST_FILE
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+        if {key: existing.get(key) for key in manifest} == manifest:
+            return existing
+    
+    rng = random.Random(seed)
+    vocabulary = class_vocabulary(vocabulary_size, rng)
+    pool = []
+    total_bytes = 0
+    total_sections = 0
+    
+    for index in range(pages):
+        sections = []
+        for _ in range(rng.randint(max(1, sections_per_page // 2), max(1, sections_per_page * 3 // 2))):
+            if pool and rng.random() < duplicate_ratio:
+                sections.append(rng.choice(pool))
+            else:
+                section = random_section(rng, vocabulary, depth)
+                sections.append(section)
+                if len(pool) < 500:
+                    pool.append(section)
+        total_sections += len(sections)
+        
+        html = ('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+                f'<title>Page {index}</title>\n'
+                '<script src="/js/app.js" defer></script>\n'
+                '</head>\n<body>\n<header class="site-header"><nav><a href="/">Home</a></nav></header>\n'
+                + '\n'.join(sections) +
+                '\n<section class="footer"><p>&copy; Example</p></section>\n</body>\n</html>\n')
+        
+        file_path = root_path / page_path(index)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        data = html.encode('utf-8')
+        file_path.write_bytes(data)
+        total_bytes += len(data)
+    
+    manifest['total_bytes'] = total_bytes
+    manifest['total_sections'] = total_sections
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a deterministic synthetic site for benchmarking')
+    parser.add_argument('directory', help='Directory to write the site to')
+    parser.add_argument('--pages', '-n', type=int, default=1000,
+                       help='Number of pages (default: 1000)')
+    parser.add_argument('--sections', type=int, default=DEFAULT_SECTIONS_PER_PAGE,
+                       help=f'Average sections per page (default: {DEFAULT_SECTIONS_PER_PAGE})')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH,
+                       help=f'Maximum nesting depth inside a section (default: {DEFAULT_DEPTH})')
+    parser.add_argument('--vocabulary', type=int, default=DEFAULT_VOCABULARY,
+                       help=f'Number of distinct class names (default: {DEFAULT_VOCABULARY})')
+    parser.add_argument('--duplicates', type=float, default=DEFAULT_DUPLICATE_RATIO,
+                       help=f'Share of sections repeated from earlier pages, 0-1 (default: {DEFAULT_DUPLICATE_RATIO})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                       help=f'Random seed (default: {DEFAULT_SEED})')
+    
+    args = parser.parse_args()
+    if not 0 <= args.duplicates <= 1:
+        parser.error('--duplicates must be between 0 and 1')
+    
+    manifest = generate_site(args.directory, args.pages, args.sections, args.depth,
+                             args.vocabulary, args.duplicates, args.seed)
+    print(f"Site in {os.path.abspath(args.directory)}: {manifest['pages']} pages, "
+          f"{manifest['total_sections']} sections, {manifest['total_bytes']:,} bytes")
+
+if __name__ == "__main__":
+    main()
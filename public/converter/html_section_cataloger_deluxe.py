@@ -7,112 +7,715 @@ including analysis of unique elements within each section.
 
 import os
 import json
+import math
+import random
+import mmap
+import re
 from pathlib import Path
 from bs4 import BeautifulSoup
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, deque
 import argparse
+import codecs
+import cProfile
+import fnmatch
+import gzip
 import hashlib
+import heapq
+import itertools
+import shutil
+import sqlite3
+import sys
+import tarfile
+import time
+import zipfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from html.parser import HTMLParser
 
-def get_element_signature(element):
-    """Create a signature for an element based on its tag and classes only."""
-    tag = element.name
-    classes = element.get('class', [])
+# Optional fast backend that skips BeautifulSoup entirely (pip install selectolax)
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Optional, only needed for .tar.zst archives (pip install zstandard)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Optional sampling profiler for --profile FILE.html (pip install pyinstrument)
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+# Non-content structural attributes that are part of an element's signature (excluding src and id)
+KEY_ATTRIBUTES = ['type', 'role', 'loading']
+
+# Bump whenever parse_html_file() output changes shape or meaning, so cached results get thrown away
+CATALOG_RULES_VERSION = 3
+
+# What each document is analyzed for unless more is asked for; see ANALYZERS for the names
+DEFAULT_ANALYZERS = ('sections',)
+
+# type="" values browsers run as classic JavaScript; other types besides "module" are data (JSON-LD, templates, import maps)
+JAVASCRIPT_TYPES = {'', 'text/javascript', 'application/javascript', 'text/ecmascript', 'application/ecmascript',
+                    'application/x-javascript', 'text/jscript', 'text/livescript'}
+# Characters of an inline script's body shown in the scripts report
+SCRIPT_PREVIEW_LENGTH = 80
+
+DEFAULT_CACHE_DIR = '.cataloger-cache'
+
+# Catalog database written by --db and read by the query subcommand; bump the version when the schema changes
+CATALOG_DB_VERSION = 1
+CATALOG_DB_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL, name TEXT NOT NULL);
+CREATE TABLE signatures (id INTEGER PRIMARY KEY, tag TEXT NOT NULL, classes TEXT NOT NULL,
+                         element_key TEXT NOT NULL, display TEXT NOT NULL);
+CREATE TABLE signature_classes (signature_id INTEGER NOT NULL, class TEXT NOT NULL);
+CREATE TABLE signature_attributes (signature_id INTEGER NOT NULL, name TEXT NOT NULL, value TEXT NOT NULL);
+CREATE TABLE structures (id INTEGER PRIMARY KEY, structure_key TEXT NOT NULL, tag TEXT NOT NULL,
+                         classes TEXT NOT NULL, content_hash TEXT NOT NULL, total_elements INTEGER,
+                         unique_elements INTEGER, occurrence_count INTEGER, file_count INTEGER,
+                         first_seen_file_id INTEGER);
+CREATE TABLE structure_classes (structure_id INTEGER NOT NULL, class TEXT NOT NULL);
+CREATE TABLE variants (structure_id INTEGER NOT NULL, content_hash TEXT NOT NULL,
+                       occurrences INTEGER, first_seen_file_id INTEGER);
+CREATE TABLE structure_files (structure_id INTEGER NOT NULL, file_id INTEGER NOT NULL, occurrences INTEGER);
+CREATE TABLE occurrences (structure_id INTEGER NOT NULL, file_id INTEGER NOT NULL, attributes TEXT);
+CREATE TABLE children (structure_id INTEGER NOT NULL, signature_id INTEGER NOT NULL, file_id INTEGER NOT NULL);
+"""
+# Created after the bulk insert, which is much faster than maintaining them row by row
+CATALOG_DB_INDEXES = """
+CREATE UNIQUE INDEX files_path ON files (path);
+CREATE INDEX files_name ON files (name);
+CREATE INDEX signatures_tag ON signatures (tag);
+CREATE INDEX signature_classes_class ON signature_classes (class, signature_id);
+CREATE INDEX signature_attributes_name ON signature_attributes (name, value, signature_id);
+CREATE UNIQUE INDEX structures_key ON structures (structure_key);
+CREATE INDEX structures_content_hash ON structures (content_hash);
+CREATE INDEX structure_classes_class ON structure_classes (class, structure_id);
+CREATE INDEX variants_content_hash ON variants (content_hash, structure_id);
+CREATE UNIQUE INDEX structure_files_pair ON structure_files (structure_id, file_id);
+CREATE INDEX structure_files_file ON structure_files (file_id);
+CREATE INDEX occurrences_structure ON occurrences (structure_id, file_id);
+CREATE INDEX occurrences_file ON occurrences (file_id);
+CREATE INDEX children_membership ON children (structure_id, file_id, signature_id);
+CREATE INDEX children_signature ON children (signature_id);
+"""
+# Child selectors for the query subcommand: tag, .classes and [attr] / [attr=value] filters
+CHILD_SELECTOR = re.compile(r'([\w-]*|\*)((?:\.[\w-]+)*)((?:\[[\w-]+(?:=[^\]]*)?\])*)')
+# Rows buffered per table before an executemany() in the export transaction
+CATALOG_DB_BATCH_ROWS = 5000
+
+# File extensions cataloged unless --ext is given
+DEFAULT_EXTENSIONS = ['.html']
+
+# Directories never worth descending into when run from a site or project root
+DEFAULT_EXCLUDES = ['node_modules/', '.git/', '.svn/', '.hg/', '__pycache__/', '.venv/', 'venv/', '.cache/',
+                    '.sass-cache/', '.parcel-cache/', '.next/', '.nuxt/', '.astro/', DEFAULT_CACHE_DIR + '/']
+
+# Archives that can be cataloged in place of a directory, without extracting them
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz', '.tar.zst', '.tzst')
+ZSTD_SUFFIXES = ('.tar.zst', '.tzst')
+
+# Optional file in the root directory with one exclude pattern per line
+CATALOG_IGNORE_FILE = '.catalogignore'
+
+# Near-duplicate detection: element keys per shingle, MinHash permutations, and the default
+# estimated Jaccard similarity at which two section variants are clustered together
+SHINGLE_SIZE = 3
+DEFAULT_MINHASH_PERMUTATIONS = 64
+DEFAULT_SIMILARITY_THRESHOLD = 0.8
+MINHASH_PRIME = (1 << 61) - 1
+
+# Files sent to a worker process at a time, and how many batches per worker may be in flight
+PARSE_BATCH_SIZE = 16
+PARSE_BATCHES_IN_FLIGHT = 4
+
+# Seconds between progress line updates, and how many of the slowest files --stats-json keeps
+PROGRESS_INTERVAL = 0.5
+DEFAULT_SLOWEST_FILES = 10
+
+# Partial catalogs written by --partial and combined by the merge subcommand
+PARTIAL_FORMAT = 'html-section-catalog-partial'
+PARTIAL_VERSION = 1
+
+# --sample: the discovery rate (new structure keys or content hashes per file) is measured over
+# this many files, and sampling stops once it drops below the stop rate
+DEFAULT_SAMPLE_WINDOW = 200
+DEFAULT_SAMPLE_STOP_RATE = 0.01
+DEFAULT_SAMPLE_SEED = 1
+# Files per worker parsed ahead of the sampler, so a saturated sample stops about when it should
+SAMPLE_LOOKAHEAD = 1
+# Folder levels that separate strata; deeper ones (dates, slugs) fall in their parent's stratum
+SAMPLE_STRATUM_DEPTH = 2
+DIGIT_RUN = re.compile(r'\d+')
+# Normal quantile for the 95% confidence intervals of sampled estimates
+CONFIDENCE_Z = 1.96
+
+# --dedup: files are matched on their exact bytes, or with --dedup-normalize after collapsing
+# whitespace and masking VOLATILE_PATTERNS, markup that changes per build or request but not per page
+DEDUP_EXACT = 'exact'
+DEDUP_NORMALIZED = 'normalized'
+VOLATILE_PATTERNS = [
+    # Per-request tokens: nonces, and the value of CSRF meta tags and hidden inputs
+    (re.compile(rb'\b(nonce|integrity|data-nonce|data-csrf[\w-]*)\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+)', re.IGNORECASE), rb'\1=""'),
+    (re.compile(rb'(<(?:meta|input)\b(?=[^>]*(?:csrf|xsrf|authenticity_token|_wpnonce|_token|requestverificationtoken))'
+                rb'[^>]*?(?<![\w-])(?:content|value)\s*=\s*)("[^"]*"|\'[^\']*\'|[^\s>]+)', re.IGNORECASE), rb'\1""'),
+    # Build hashes in asset names (app.3f9a8c1d.js) and cache-busting query strings (?ver=6.4.2)
+    (re.compile(rb'([.-])[0-9a-f]{8,}(\.(?:js|mjs|css|map|png|jpe?g|gif|svg|webp|woff2?)\b)', re.IGNORECASE), rb'\1#\2'),
+    (re.compile(rb'\?(v|ver|version|hash|build|rev)=[\w.-]+', re.IGNORECASE), rb'?\1=#'),
+]
+# Whitespace runs, or a whole element whose text keeps its whitespace (inline scripts are cataloged by it)
+WHITESPACE_OR_VERBATIM = re.compile(rb'(<(script|pre|textarea)\b.*?</\2\s*>)|\s+', re.IGNORECASE | re.DOTALL)
+
+# Seconds between polls of the tree in --watch mode
+DEFAULT_WATCH_INTERVAL = 1.0
+
+# Content hashes are BLAKE2b digests truncated to this many hex characters (at most 128);
+# raise it with --hash-length if different section contents start colliding on large sites
+DEFAULT_HASH_LENGTH = 8
+
+# Every <section> tag and every class containing "section" has these bytes somewhere in the file
+SECTION_MARKER = re.compile(rb'section', re.IGNORECASE)
+# ...and every <script> tag has these
+SCRIPT_MARKER = re.compile(rb'<script', re.IGNORECASE)
+
+# Byte order marks of encodings the byte-level pre-scan can't see ASCII text through
+WIDE_ENCODING_BOMS = (b'\xff\xfe', b'\xfe\xff')
+
+# Byte order marks and the codecs that decode them, longest first (UTF-32 LE starts like UTF-16 LE)
+ENCODING_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="text/html; charset=...">
+META_CHARSET = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([-\w.:]+)', re.IGNORECASE)
+
+# How far into a file to look for a <meta> charset declaration
+META_CHARSET_SCAN_BYTES = 4096
+
+# Tried in order after any BOM or declared charset; legacy pages without a declaration are mostly Windows-1252
+FALLBACK_ENCODINGS = ['utf-8', 'windows-1252']
+
+# Parser backends selectable with --parser; 'html.parser' is the reference the others are checked against
+PARSER_BACKENDS = ['html.parser', 'lxml', 'selectolax']
+DEFAULT_PARSER = 'html.parser'
+
+# Elements BeautifulSoup's html.parser builder closes as soon as they open
+VOID_ELEMENTS = {'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image', 'img',
+                 'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer',
+                 'track', 'wbr'}
+
+# Files at least this big (MB) are streamed through an event parser instead of parsed into a tree
+DEFAULT_STREAM_THRESHOLD_MB = 32
+# Bytes read, decoded and fed to the event parser at a time when streaming
+STREAM_CHUNK_BYTES = 1 << 20
+
+# Attributes BeautifulSoup splits into lists for HTML documents, mirrored by the selectolax backend and streaming
+MULTI_VALUED_ATTRIBUTES = {
+    '*': {'class', 'accesskey', 'dropzone'},
+    'a': {'rel', 'rev'},
+    'link': {'rel', 'rev'},
+    'td': {'headers'},
+    'th': {'headers'},
+    'form': {'accept-charset'},
+    'object': {'archive'},
+    'area': {'rel'},
+    'icon': {'sizes'},
+    'iframe': {'sandbox'},
+    'output': {'for'},
+}
+
+def get_element_key(signature):
+    """Key used for counting and hashing elements (sorted classes plus key attributes)."""
+    classes_str = ' '.join(sorted(signature['classes']))
+    attrs_str = ' '.join([f"{k}:{v}" for k, v in sorted(signature['key_attributes'].items())])
+    return f"{signature['tag']}.{classes_str}|{attrs_str}"
+
+def get_element_display(signature):
+    """Unique children display format, e.g. <img class="hero" loading="lazy">."""
+    if signature['classes']:
+        class_attr = f' class="{" ".join(signature["classes"])}"'
+    else:
+        class_attr = ''
     
-    # Only include non-content structural attributes (excluding src and id)
-    key_attrs = {}
-    for attr in ['type', 'role', 'loading']:
-        if element.get(attr):
-            key_attrs[attr] = element.get(attr)
+    # Add key attributes to display
+    key_attrs = ''
+    for attr, value in signature['key_attributes'].items():
+        key_attrs += f' {attr}="{value}"'
     
-    signature = {
-        'tag': tag,
-        'classes': classes if isinstance(classes, list) else [classes],
-        'key_attributes': key_attrs
-    }
+    return f"<{signature['tag']}{class_attr}{key_attrs}>"
+
+class InternedSignature:
+    """One distinct element signature, with its counting key and display form computed once."""
+    
+    __slots__ = ('tag', 'classes', 'key_attributes', 'key', 'display', 'key_bytes', 'separated_key_bytes')
     
-    return signature
+    def __init__(self, tag, classes, key_attributes):
+        self.tag = tag
+        self.classes = classes
+        self.key_attributes = key_attributes
+        signature = self.expand()
+        self.key = get_element_key(signature)
+        self.display = get_element_display(signature)
+        # Pre-encoded forms for feeding the content hash one element at a time
+        self.key_bytes = self.key.encode()
+        self.separated_key_bytes = b'|' + self.key_bytes
+    
+    def expand(self):
+        """The signature as a {'tag', 'classes', 'key_attributes'} dict, the form used in the JSON output."""
+        return {
+            'tag': self.tag,
+            'classes': list(self.classes),
+            'key_attributes': {attr: list(value) if isinstance(value, tuple) else value
+                               for attr, value in self.key_attributes}
+        }
 
-def analyze_section_content(section):
-    """Analyze the content structure of a section."""
-    # Get all child elements (not just direct children)
-    all_elements = section.find_all()
+class SignatureTable:
+    """Interns element signatures so every identical element shares one record, referenced by ID.
     
-    element_signatures = []
-    element_counts = Counter()
-    unique_children = set()
+    IDs are only meaningful inside the process that assigned them; use pack_sections() and
+    unpack_sections() to move parse results between processes or through the cache.
+    """
     
-    for element in all_elements:
-        signature = get_element_signature(element)
-        element_signatures.append(signature)
-        
-        # Create a simple key for counting (classes only)
-        classes_str = ' '.join(sorted(signature['classes']))
-        attrs_str = ' '.join([f"{k}:{v}" for k, v in sorted(signature['key_attributes'].items())])
-        element_key = f"{signature['tag']}.{classes_str}|{attrs_str}"
-        element_counts[element_key] += 1
-        
-        # Create unique children display format (classes only)
-        if signature['classes']:
-            class_attr = f' class="{" ".join(signature["classes"])}"'
-        else:
-            class_attr = ''
-        
-        # Add key attributes to display
-        key_attrs = ''
-        for attr, value in signature['key_attributes'].items():
-            key_attrs += f' {attr}="{value}"'
+    def __init__(self):
+        self.ids = {}
+        self.records = []
+        self.class_tuples = {}
+    
+    def intern(self, tag, classes, key_attributes):
+        """ID for a signature given as (tag, class sequence, ((attr, value), ...))."""
+        classes = tuple(classes)
+        signature = (tag, classes, key_attributes)
+        signature_id = self.ids.get(signature)
+        if signature_id is None:
+            # Identical class lists share a single tuple across all records
+            classes = self.class_tuples.setdefault(classes, classes)
+            signature_id = len(self.records)
+            self.records.append(InternedSignature(tag, classes, key_attributes))
+            self.ids[(tag, classes, key_attributes)] = signature_id
+        return signature_id
+    
+    def intern_element(self, element):
+        """ID for a parsed element's signature: its tag, its classes and whichever KEY_ATTRIBUTES it sets."""
+        classes = element.get('class', [])
+        if not isinstance(classes, list):
+            classes = [classes]
+        # Only non-content structural attributes count (never src or id)
+        key_attributes = []
+        for attr in KEY_ATTRIBUTES:
+            value = element.get(attr)
+            if value:
+                # Multi-valued attributes come back as lists, which can't be dict keys
+                key_attributes.append((attr, tuple(value) if isinstance(value, list) else value))
+        return self.intern(element.name, classes, tuple(key_attributes))
+    
+    def expand(self, signature_ids):
+        """Signature dicts (see InternedSignature.expand()) for a sequence of IDs."""
+        return [self.records[signature_id].expand() for signature_id in signature_ids]
+
+# Signature table shared by everything parsed in this process
+SIGNATURES = SignatureTable()
+
+# Parent position of the top-level elements in a document index
+ROOT_POSITION = -1
+
+def iter_child_elements(element):
+    """Direct child elements of a parsed element, skipping text, comments and doctypes."""
+    return [child for child in element.children if child.name is not None]
+
+def index_document(root, sign=True):
+    """Walk a parsed tree once, signing every element below `root` exactly once.
+    
+    Elements are listed in document order (the order of find_all()), and ends[i] marks
+    where element i's subtree stops, so its descendants are positions i + 1 to ends[i].
+    Nested sections then aggregate slices of the shared lists instead of re-walking and
+    re-signing their subtrees.
+    signature_ids[i] is the element's ID in SIGNATURES.
+    parents[i] is the position of element i's parent (ROOT_POSITION for children of `root`).
+    section_ancestors holds every position, plus ROOT_POSITION, that has a <section>
+    somewhere below it.
+    With sign=False elements are only listed, not signed, and signature_ids stays empty.
+    """
+    elements = []
+    ends = []
+    parents = []
+    signature_ids = array('I')
+    
+    # Iterative depth-first walk; deeply nested page builder output would blow the recursion limit
+    stack = [iter(iter_child_elements(root))]
+    open_positions = []
+    while stack:
+        element = next(stack[-1], None)
+        if element is None:
+            stack.pop()
+            if open_positions:
+                ends[open_positions.pop()] = len(elements)
+            continue
         
-        unique_child = f"<{signature['tag']}{class_attr}{key_attrs}>"
-        unique_children.add(unique_child)
+        parents.append(open_positions[-1] if open_positions else ROOT_POSITION)
+        open_positions.append(len(elements))
+        elements.append(element)
+        ends.append(None)
+        if sign:
+            signature_ids.append(SIGNATURES.intern_element(element))
+        stack.append(iter(iter_child_elements(element)))
+    
+    # Mark the ancestors of every section, stopping at the first one already marked,
+    # so the whole index costs one pass over the sections' ancestor chains
+    section_ancestors = set()
+    for position, element in enumerate(elements):
+        if element.name != 'section':
+            continue
+        parent = parents[position]
+        while parent not in section_ancestors:
+            section_ancestors.add(parent)
+            if parent == ROOT_POSITION:
+                break
+            parent = parents[parent]
     
     return {
-        'element_signatures': element_signatures,
+        'elements': elements,
+        'ends': ends,
+        'parents': parents,
+        'section_ancestors': section_ancestors,
+        'signature_ids': signature_ids
+    }
+
+def summarize_signatures(signature_ids):
+    """Content analysis for a run of elements given by their signature IDs.
+    
+    element_signatures stays a compact array of IDs; expand it with SIGNATURES.expand().
+    """
+    records = SIGNATURES.records
+    
+    # Count IDs first, then fold IDs that share a counting key (same classes in another order);
+    # Counter keeps first-seen order, so the keys come out in the same order as counting them directly
+    element_counts = Counter()
+    for signature_id, count in Counter(signature_ids).items():
+        element_counts[records[signature_id].key] += count
+    
+    return {
+        'element_signatures': signature_ids,
         'element_counts': dict(element_counts),
-        'unique_children': sorted(list(unique_children)),
-        'total_elements': len(all_elements),
+        'unique_children': sorted(set(records[signature_id].display for signature_id in set(signature_ids))),
+        'total_elements': len(signature_ids),
         'unique_elements': len(element_counts)
     }
 
-def create_content_hash(content_analysis):
-    """Create a hash of the section's content structure for comparison."""
-    # Create a string representation of the element structure
-    element_keys = []
-    for sig in content_analysis['element_signatures']:
-        classes_str = ' '.join(sorted(sig['classes']))
-        attrs_str = ' '.join([f"{k}:{v}" for k, v in sorted(sig['key_attributes'].items())])
-        key = f"{sig['tag']}.{classes_str}|{attrs_str}"
-        element_keys.append(key)
+def analyze_section_content(section):
+    """Analyze the content structure of a section."""
+    # Get all child elements (not just direct children)
+    return summarize_signatures(index_document(section)['signature_ids'])
+
+def create_content_hash(content_analysis, hash_length=DEFAULT_HASH_LENGTH):
+    """Create a hash of the section's content structure for comparison.
+    
+    Equivalent to hashing the element keys joined with '|', but streamed into BLAKE2b one
+    element at a time so the joined string is never built.
+    """
+    records = SIGNATURES.records
+    hasher = hashlib.blake2b(digest_size=(hash_length + 1) // 2)
+    signature_ids = iter(content_analysis['element_signatures'])
+    for signature_id in signature_ids:
+        hasher.update(records[signature_id].key_bytes)
+        break
+    for signature_id in signature_ids:
+        hasher.update(records[signature_id].separated_key_bytes)
+    return hasher.hexdigest()[:hash_length]
+
+def expand_content_analysis(content_analysis):
+    """Copy of a content analysis with element_signatures expanded from IDs to signature dicts."""
+    expanded = dict(content_analysis)
+    expanded['element_signatures'] = SIGNATURES.expand(content_analysis['element_signatures'])
+    return expanded
+
+def pack_sections(sections):
+    """Make parse results independent of this process's signature table.
+    
+    Returns a JSON-friendly dict whose sections refer to signatures by position in its own list.
+    """
+    local_ids = {}
+    signatures = []
+    packed_sections = []
+    for section in sections:
+        content_analysis = dict(section['content_analysis'])
+        local = []
+        for signature_id in content_analysis['element_signatures']:
+            local_id = local_ids.get(signature_id)
+            if local_id is None:
+                local_id = local_ids[signature_id] = len(signatures)
+                record = SIGNATURES.records[signature_id]
+                signatures.append([record.tag, list(record.classes),
+                                   [[attr, list(value) if isinstance(value, tuple) else value]
+                                    for attr, value in record.key_attributes]])
+            local.append(local_id)
+        content_analysis['element_signatures'] = local
+        packed_sections.append(dict(section, content_analysis=content_analysis))
+    
+    return {'signatures': signatures, 'sections': packed_sections}
+
+def unpack_sections(packed):
+    """Re-intern the output of pack_sections() into this process's signature table."""
+    ids = [
+        SIGNATURES.intern(tag, classes, tuple((attr, tuple(value) if isinstance(value, list) else value)
+                                              for attr, value in key_attributes))
+        for tag, classes, key_attributes in packed['signatures']
+    ]
+    sections = packed['sections']
+    for section in sections:
+        content_analysis = section['content_analysis']
+        content_analysis['element_signatures'] = array('I', (ids[local_id] for local_id in content_analysis['element_signatures']))
+    return sections
+
+class LexborElement:
+    """Wraps a selectolax node in the small part of the BeautifulSoup Tag API the cataloger uses."""
+    
+    __slots__ = ('node', 'name', 'attrs')
+    
+    def __init__(self, node):
+        self.node = node
+        self.name = node.tag
+        self.attrs = {}
+        multi_valued = MULTI_VALUED_ATTRIBUTES['*'] | MULTI_VALUED_ATTRIBUTES.get(node.tag, set())
+        for attr, value in node.attributes.items():
+            # Valueless attributes (<input disabled>) come back as None, BeautifulSoup uses ''
+            value = '' if value is None else value
+            self.attrs[attr] = value.split() if attr in multi_valued else value
+    
+    def get(self, attr, default=None):
+        return self.attrs.get(attr, default)
+    
+    def get_text(self):
+        return self.node.text(deep=True)
+    
+    @property
+    def children(self):
+        return [LexborElement(node) for node in self.node.iter(include_text=False) if not node.tag.startswith('-')]
+    
+    def find_all(self, name=None):
+        """All descendant elements in document order, optionally only those with the given tag."""
+        nodes = self.node.traverse(include_text=False)
+        next(nodes, None)  # traverse() starts with the node itself
+        return [LexborElement(node) for node in nodes
+                if not node.tag.startswith('-') and (name is None or node.tag == name)]
+
+class LexborDocument(LexborElement):
+    """The document node of a selectolax tree, the counterpart of the BeautifulSoup object."""
+    
+    def __init__(self, node):
+        self.node = node
+        self.name = '[document]'
+        self.attrs = {}
+    
+    @property
+    def children(self):
+        root = self.node.child
+        while root is not None and root.tag.startswith('-'):
+            root = root.next
+        return [LexborElement(root)] if root is not None else []
+    
+    def find_all(self, name=None):
+        root = self.node.child
+        while root is not None and root.tag.startswith('-'):
+            root = root.next
+        if root is None:
+            return []
+        elements = [LexborElement(root)] if name is None or root.tag == name else []
+        return elements + LexborElement(root).find_all(name)
+
+def available_parsers():
+    """Parser backends that can run in this environment."""
+    available = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        available.append('lxml')
+    except ImportError:
+        pass
+    if LexborHTMLParser is not None:
+        available.append('selectolax')
+    return available
+
+def parse_document(content, parser=DEFAULT_PARSER):
+    """Parse HTML with the selected backend into a tree exposing the BeautifulSoup Tag API subset we use."""
+    if parser == 'selectolax':
+        if LexborHTMLParser is None:
+            raise RuntimeError("the selectolax parser needs the selectolax package (pip install selectolax)")
+        tree = LexborHTMLParser(content)
+        return LexborDocument(tree.root.parent)
+    return BeautifulSoup(content, parser)
+
+def sniff_encodings(data):
+    """Encodings to try for raw HTML bytes: a BOM wins, then a <meta> declaration, then the fallbacks."""
+    for bom, encoding in ENCODING_BOMS:
+        if data.startswith(bom):
+            return [encoding]
+    
+    candidates = []
+    match = META_CHARSET.search(data, 0, META_CHARSET_SCAN_BYTES)
+    if match:
+        declared = match.group(1).decode('ascii', 'ignore').lower()
+        # Browsers treat these labels as Windows-1252, and a UTF-16 declaration in an
+        # ASCII-readable file as UTF-8 (see the WHATWG encoding standard)
+        if declared in ('iso-8859-1', 'latin1', 'latin-1', 'us-ascii', 'ascii'):
+            declared = 'windows-1252'
+        elif declared.startswith('utf-16'):
+            declared = 'utf-8'
+        try:
+            candidates.append(codecs.lookup(declared).name)
+        except LookupError:
+            pass
+    
+    for encoding in FALLBACK_ENCODINGS:
+        if codecs.lookup(encoding).name not in candidates:
+            candidates.append(codecs.lookup(encoding).name)
+    return candidates
+
+def decode_html(data):
+    """Decode raw HTML bytes with the first sniffed encoding that fits, returning (text, encoding).
+    
+    Line breaks are normalized to LF, as the HTML spec does before tokenizing. Raises
+    ValueError if none of the candidate encodings can decode the bytes.
+    """
+    candidates = sniff_encodings(data)
+    for encoding in candidates:
+        try:
+            text = data.decode(encoding)
+        except UnicodeDecodeError as e:
+            failure = e
+            continue
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text, encoding
     
-    content_string = '|'.join(element_keys)
-    return hashlib.md5(content_string.encode()).hexdigest()[:8]
+    raise ValueError(f"not decodable as {' or '.join(candidates)} "
+                     f"(last try: {failure.reason} at byte {failure.start})")
 
-def parse_html_file(file_path):
+def parse_html_file(file_path, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH):
     """Parse an HTML file and extract section elements and section-like divs with their attributes and content."""
+    section_data, error = try_parse_html_file(file_path, parser, hash_length)
+    if error:
+        print(f"Error parsing {file_path}: {error['error']}")
+    return section_data
+
+def record_stage(timings, stage, started):
+    """Add the time since `started` to timings[stage] (when collecting timings) and return the current time."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + now - started
+    return now
+
+def try_parse_html_file(file_path, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, timings=None):
+    """Parse an HTML file, returning (section_data, error) instead of printing errors.
+    
+    error is None on success, otherwise a dict with the 'file', the 'stage' that failed
+    ('read', 'decode' or 'parse') and the 'error' message.
+    If a `timings` dict is given, seconds spent per stage are added to it: 'read', 'decode',
+    'parse', 'signatures' (indexing the document), 'detect' (finding sections) and 'analyze'.
+    """
+    tick = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as file:
+            data = file.read()
+    except Exception as e:
+        record_stage(timings, 'read', tick)
+        return [], {'file': str(file_path), 'stage': 'read', 'error': str(e)}
+    record_stage(timings, 'read', tick)
+    return try_parse_html_bytes(data, file_path, parser, hash_length, timings)
+
+def try_parse_html_bytes(data, file_path, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, timings=None):
+    """try_parse_html_file() for contents already in memory (e.g. an archive member); file_path only labels the results."""
+    results, error = analyze_html_bytes(data, file_path, parser, hash_length, timings)
+    return results.get('sections', []), error
+
+def analyze_html_bytes(data, file_path, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, timings=None,
+                       analyzers=DEFAULT_ANALYZERS):
+    """Decode and parse a document once and run every analyzer named in `analyzers` over it.
+    
+    Returns ({analyzer name: its records}, error), with error as in try_parse_html_file().
+    Analyzers add their own stages to `timings` after 'decode', 'parse' and 'signatures'.
+    """
+    stage = 'decode'
+    tick = time.perf_counter()
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+        content, encoding = decode_html(data)
+        tick = record_stage(timings, 'decode', tick)
         
-        soup = BeautifulSoup(content, 'html.parser')
+        stage = 'parse'
+        soup = parse_document(content, parser)
+        tick = record_stage(timings, 'parse', tick)
+        
+        # Walk the tree once (signing every element if sections are wanted); each analyzer works from this shared index
+        document_index = index_document(soup, sign='sections' in analyzers)
+        record_stage(timings, 'signatures', tick)
+        
+        results = {}
+        for name in analyzers:
+            tick = time.perf_counter()
+            results[name] = ANALYZERS[name].analyze(document_index, file_path, hash_length, timings)
+        return results, None
+    
+    except Exception as e:
+        record_stage(timings, stage, tick)
+        return {}, {'file': str(file_path), 'stage': stage, 'error': str(e)}
+
+def section_record(section, content_analysis, file_path, hash_length=DEFAULT_HASH_LENGTH):
+    """The catalog record of a section or section-like div, given the content analysis of its descendants."""
+    classes = section.get('class', [])
+    # Create a unique identifier for this section (classes only, no ID)
+    return {
+        'classes': classes if isinstance(classes, list) else [classes],
+        'file': str(file_path),
+        'attributes': dict(section.attrs),
+        'content_analysis': content_analysis,
+        'content_hash': create_content_hash(content_analysis, hash_length),
+        'tag': section.name  # Track whether it's a section or div
+    }
+
+class SectionAnalyzer:
+    """Finds the <section>s and section-like divs of an indexed document and analyzes their content."""
+    
+    name = 'sections'
+    marker = SECTION_MARKER
+    
+    def analyze(self, document_index, file_path, hash_length=DEFAULT_HASH_LENGTH, timings=None):
+        tick = time.perf_counter()
+        elements = document_index['elements']
         
         # Find all sections
-        sections = soup.find_all('section')
+        sections = [position for position, element in enumerate(elements) if element.name == 'section']
         
         # Find div elements that are siblings of sections and have "section" in their class names
         section_like_divs = []
-        for div in soup.find_all('div'):
+        for position, div in enumerate(elements):
+            if div.name != 'div':
+                continue
             classes = div.get('class', [])
             # Check if any class contains "section"
             if any('section' in cls.lower() for cls in classes):
-                # Check if it's a sibling of sections (same parent level)
-                parent = div.parent
-                if parent and parent.find_all('section'):
-                    section_like_divs.append(div)
+                # Check if it's a sibling of sections (same parent level), i.e. whether
+                # its parent has a section anywhere below it
+                if document_index['parents'][position] in document_index['section_ancestors']:
+                    section_like_divs.append(position)
         
         # Combine sections and section-like divs
         all_sections = sections + section_like_divs
+        tick = record_stage(timings, 'detect', tick)
         
         section_data = []
-        for section in all_sections:
+        for position in all_sections:
+            section = elements[position]
             # Extract classes
             classes = section.get('class', [])
             
@@ -121,25 +724,422 @@ def parse_html_file(file_path):
                 continue
             
             # Analyze the content structure
-            content_analysis = analyze_section_content(section)
-            content_hash = create_content_hash(content_analysis)
-            
-            # Create a unique identifier for this section (classes only, no ID)
-            section_info = {
-                'classes': classes if isinstance(classes, list) else [classes],
-                'file': str(file_path),
-                'attributes': dict(section.attrs),
-                'content_analysis': content_analysis,
-                'content_hash': content_hash,
-                'tag': section.name  # Track whether it's a section or div
-            }
-            section_data.append(section_info)
-        
+            start, end = position + 1, document_index['ends'][position]
+            content_analysis = summarize_signatures(document_index['signature_ids'][start:end])
+            section_data.append(section_record(section, content_analysis, file_path, hash_length))
+        record_stage(timings, 'analyze', tick)
         return section_data
     
+    def stream(self, file_path, hash_length=DEFAULT_HASH_LENGTH):
+        return SectionStream(file_path, hash_length)
+    
+    def pack(self, sections):
+        return pack_sections(sections)
+    
+    def unpack(self, packed):
+        return unpack_sections(packed)
+
+def script_loading(attributes, script_type, external):
+    """How a browser runs a script: 'async', 'defer', 'module' (deferred), 'blocking', or 'data' if it isn't run at all."""
+    if script_type != 'module' and script_type not in JAVASCRIPT_TYPES:
+        return 'data'
+    # async and defer are ignored on inline classic scripts; inline modules still honour async
+    if 'async' in attributes and (external or script_type == 'module'):
+        return 'async'
+    if script_type == 'module':
+        return 'module'
+    if 'defer' in attributes and external:
+        return 'defer'
+    return 'blocking'
+
+def script_record(element, in_head, get_body, file_path, hash_length=DEFAULT_HASH_LENGTH):
+    """The catalog record of a <script> element, or None for an empty inline one.
+    
+    get_body() returns the script's text; it is only called for inline scripts.
+    """
+    src = (element.get('src') or '').strip()
+    script_type = (element.get('type') or '').strip().lower()
+    script = {
+        'file': str(file_path),
+        'src': src or None,
+        'digest': None,
+        'type': script_type,
+        'loading': script_loading(element.attrs, script_type, bool(src)),
+        'position': 'head' if in_head else 'body',
+        'size': 0,
+        'preview': '',
+        'attributes': dict(element.attrs)
+    }
+    if not src:
+        body = get_body().strip()
+        # An empty inline tag doesn't run anything
+        if not body:
+            return None
+        digest = hashlib.blake2b(body.encode('utf-8', 'replace'), digest_size=(hash_length + 1) // 2)
+        script['digest'] = digest.hexdigest()[:hash_length]
+        script['size'] = len(body)
+        script['preview'] = ' '.join(body[:SCRIPT_PREVIEW_LENGTH * 2].split())[:SCRIPT_PREVIEW_LENGTH]
+    return script
+
+class ScriptAnalyzer:
+    """Catalogs the <script> tags of an indexed document: src or inline body digest, loading and head/body position."""
+    
+    name = 'scripts'
+    marker = SCRIPT_MARKER
+    
+    def analyze(self, document_index, file_path, hash_length=DEFAULT_HASH_LENGTH, timings=None):
+        tick = time.perf_counter()
+        elements = document_index['elements']
+        ends = document_index['ends']
+        # A <head>'s descendants are the positions after it, up to where its subtree ends
+        heads = [(position, ends[position]) for position, element in enumerate(elements) if element.name == 'head']
+        
+        scripts = []
+        for position, element in enumerate(elements):
+            if element.name != 'script':
+                continue
+            in_head = any(start < position < end for start, end in heads)
+            script = script_record(element, in_head, element.get_text, file_path, hash_length)
+            if script is not None:
+                scripts.append(script)
+        record_stage(timings, 'scripts', tick)
+        return scripts
+    
+    def stream(self, file_path, hash_length=DEFAULT_HASH_LENGTH):
+        return ScriptStream(file_path, hash_length)
+    
+    def pack(self, scripts):
+        return scripts
+    
+    def unpack(self, packed):
+        return packed
+
+# Everything a document can be analyzed for in the same parse, by name
+ANALYZERS = {analyzer.name: analyzer for analyzer in (SectionAnalyzer(), ScriptAnalyzer())}
+
+def pack_results(result, analyzers=DEFAULT_ANALYZERS):
+    """Pack every analyzer's records in a catalog_file() result for the trip back from a worker process."""
+    for name in analyzers:
+        result[name] = ANALYZERS[name].pack(result[name])
+    return result
+
+def unpack_results(result, analyzers=DEFAULT_ANALYZERS):
+    """Undo pack_results() in the main process."""
+    for name in analyzers:
+        result[name] = ANALYZERS[name].unpack(result[name])
+    return result
+
+class StreamElement:
+    """An open element in streaming mode: its name and attributes, with the Tag.get() the signatures use."""
+    
+    __slots__ = ('name', 'attrs', 'ordinal')
+    
+    def __init__(self, name, attrs, ordinal):
+        self.name = name
+        self.attrs = attrs
+        self.ordinal = ordinal
+    
+    def get(self, attr, default=None):
+        return self.attrs.get(attr, default)
+
+class StreamingDocumentParser(HTMLParser):
+    """Turns HTML text fed in pieces into element start and end events for the analyzers' stream states.
+    
+    Elements are opened and closed by the rules BeautifulSoup's html.parser builder uses: void
+    elements close right away (and a later </br> is dropped), an end tag with no open element
+    of its name is ignored, any other end tag also closes everything opened inside its element,
+    and whatever is still open at the end is closed. Streamed documents therefore give the same
+    records as the html.parser backend, while only the open elements are kept in memory.
+    """
+    
+    def __init__(self, states):
+        super().__init__(convert_charrefs=False)
+        self.states = list(states)
+        # Only the script state wants text, so the sections don't pay for every text node
+        self.text_states = [state for state in self.states if hasattr(state, 'data')]
+        self.open_elements = []
+        self.open_counts = Counter()
+        # Void elements closed so far, by name; a Counter, since BeautifulSoup's list of them gets
+        # slower with every <img> on the page
+        self.closed_void_elements = Counter()
+        self.multi_valued = {}
+        self.element_count = 0
+    
+    def handle_starttag(self, tag, attrs, close_void=True):
+        multi_valued = self.multi_valued.get(tag)
+        if multi_valued is None:
+            multi_valued = self.multi_valued[tag] = MULTI_VALUED_ATTRIBUTES['*'] | MULTI_VALUED_ATTRIBUTES.get(tag, set())
+        attributes = {}
+        for attr, value in attrs:
+            # Valueless attributes become '', and a repeated attribute keeps its last value
+            attributes[attr] = '' if value is None else value
+        for attr in multi_valued.intersection(attributes):
+            attributes[attr] = attributes[attr].split()
+        
+        element = StreamElement(tag, attributes, self.element_count)
+        self.element_count += 1
+        self.open_elements.append(element)
+        self.open_counts[tag] += 1
+        for state in self.states:
+            state.start(element)
+        if close_void and tag in VOID_ELEMENTS:
+            self.close_to(tag)
+            self.closed_void_elements[tag] += 1
+    
+    def handle_startendtag(self, tag, attrs):
+        # <br/> and <div/>: open and close at once, without crossing off a later </br>
+        self.handle_starttag(tag, attrs, close_void=False)
+        self.close_to(tag)
+    
+    def handle_endtag(self, tag):
+        if self.closed_void_elements[tag]:
+            self.closed_void_elements[tag] -= 1
+        else:
+            self.close_to(tag)
+    
+    def handle_data(self, data):
+        if self.text_states and self.open_elements:
+            for state in self.text_states:
+                state.data(self.open_elements[-1], data)
+    
+    def close_to(self, tag):
+        """Close the innermost open element named `tag` and everything opened inside it."""
+        if not self.open_counts[tag]:
+            return
+        while self.pop().name != tag:
+            pass
+    
+    def pop(self):
+        element = self.open_elements.pop()
+        self.open_counts[element.name] -= 1
+        for state in self.states:
+            state.end(element)
+        return element
+    
+    def close(self):
+        super().close()
+        while self.open_elements:
+            self.pop()
+
+class SectionFrame:
+    """What SectionStream tracks for one open element."""
+    
+    __slots__ = ('capture_start', 'has_section_below', 'pending_divs')
+    
+    def __init__(self, capture_start):
+        # Where the element's descendants start in SectionStream.captured, if it is a section or a candidate div
+        self.capture_start = capture_start
+        self.has_section_below = False
+        # Section-like divs among its children, kept until we know whether it has a section below it
+        self.pending_divs = None
+
+class SectionStream:
+    """Streaming counterpart of SectionAnalyzer.analyze(), fed by a StreamingDocumentParser.
+    
+    While a <section> or a candidate div (a div with "section" in a class) is open, the
+    signature ID of every element that starts is appended to `captured`; when it closes, its
+    content analysis is the slice from where it opened. Whether a candidate div counts depends
+    on its parent having a section anywhere below it, which is only known when the parent
+    closes, so finished candidates wait on their parent's frame until then.
+    """
+    
+    def __init__(self, file_path, hash_length=DEFAULT_HASH_LENGTH):
+        self.file_path = file_path
+        self.hash_length = hash_length
+        self.frames = []
+        self.captured = array('I')
+        self.capturing = 0
+        # Generated dumps repeat the same markup thousands of times; identical runs of
+        # signatures share one content analysis instead of each holding its own copy
+        self.analyses = {}
+        self.document_has_section = False
+        self.document_divs = []
+        self.sections = []
+        self.divs = []
+    
+    def start(self, element):
+        if self.capturing:
+            self.captured.append(SIGNATURES.intern_element(element))
+        
+        capture_start = None
+        if element.name == 'section':
+            capture_start = len(self.captured)
+            # Mark the open ancestors, stopping at the first one already marked (see index_document())
+            self.document_has_section = True
+            for frame in reversed(self.frames):
+                if frame.has_section_below:
+                    break
+                frame.has_section_below = True
+        elif element.name == 'div' and any('section' in cls.lower() for cls in element.get('class', [])):
+            capture_start = len(self.captured)
+        if capture_start is not None:
+            self.capturing += 1
+        self.frames.append(SectionFrame(capture_start))
+    
+    def end(self, element):
+        frame = self.frames.pop()
+        if frame.pending_divs and frame.has_section_below:
+            self.divs.extend(frame.pending_divs)
+        if frame.capture_start is None:
+            return
+        
+        signature_ids = self.captured[frame.capture_start:]
+        key = signature_ids.tobytes()
+        content_analysis = self.analyses.get(key)
+        if content_analysis is None:
+            content_analysis = self.analyses[key] = summarize_signatures(signature_ids)
+        self.capturing -= 1
+        if not self.capturing:
+            del self.captured[:]
+        # Skip sections with 'footer' class
+        if 'footer' in element.get('class', []):
+            return
+        record = (element.ordinal, section_record(element, content_analysis, self.file_path, self.hash_length))
+        if element.name == 'section':
+            self.sections.append(record)
+        elif self.frames:
+            parent = self.frames[-1]
+            if parent.pending_divs is None:
+                parent.pending_divs = []
+            parent.pending_divs.append(record)
+        else:
+            self.document_divs.append(record)
+    
+    def finish(self):
+        """The section records, in the order SectionAnalyzer.analyze() returns them."""
+        if self.document_has_section:
+            self.divs.extend(self.document_divs)
+        self.sections.sort(key=lambda record: record[0])
+        self.divs.sort(key=lambda record: record[0])
+        return [section_info for _, section_info in self.sections + self.divs]
+
+class ScriptStream:
+    """Streaming counterpart of ScriptAnalyzer.analyze(): a script's record is made when its end tag arrives."""
+    
+    def __init__(self, file_path, hash_length=DEFAULT_HASH_LENGTH):
+        self.file_path = file_path
+        self.hash_length = hash_length
+        self.open_heads = 0
+        # (element, inside a <head>, text pieces) for each open <script>
+        self.open_scripts = []
+        self.scripts = []
+    
+    def start(self, element):
+        if element.name == 'head':
+            self.open_heads += 1
+        elif element.name == 'script':
+            self.open_scripts.append((element, self.open_heads > 0, []))
+    
+    def data(self, element, text):
+        # Script bodies are raw text, so they arrive while the script is the innermost open element
+        if self.open_scripts and self.open_scripts[-1][0] is element:
+            self.open_scripts[-1][2].append(text)
+    
+    def end(self, element):
+        if element.name == 'head':
+            self.open_heads -= 1
+        elif element.name == 'script':
+            element, in_head, pieces = self.open_scripts.pop()
+            script = script_record(element, in_head, partial(''.join, pieces), self.file_path, self.hash_length)
+            if script is not None:
+                self.scripts.append(script)
+    
+    def finish(self):
+        return self.scripts
+
+def iter_file_chunks(file_path, chunk_size=STREAM_CHUNK_BYTES):
+    """A file's bytes, chunk_size at a time."""
+    with open(file_path, 'rb') as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def iter_data_chunks(data, chunk_size=STREAM_CHUNK_BYTES):
+    """iter_file_chunks() for contents already in memory, sliced without copying."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
+
+def stream_html_chunks(open_chunks, file_path, hash_length=DEFAULT_HASH_LENGTH, timings=None,
+                       analyzers=DEFAULT_ANALYZERS):
+    """analyze_html_bytes() for a document read in chunks, without ever building its tree.
+    
+    open_chunks() returns a fresh iterator over the document's bytes; it is called again when
+    the document turns out not to be in the first sniffed encoding. Text is decoded and fed
+    to a StreamingDocumentParser one chunk at a time, and each analyzer works from the element
+    events as they arrive (see SectionStream), so memory grows with the nesting depth and the
+    records found, not with the document. The records match the html.parser backend's,
+    whatever parser was asked for. Time goes to a single 'stream' stage, since reading,
+    decoding, tokenizing and analyzing interleave; errors still name the stage that failed.
+    """
+    def open_document():
+        # The encoding is sniffed from the start of the document, however many chunks that takes
+        chunks = open_chunks()
+        head = []
+        head_size = 0
+        for chunk in chunks:
+            head.append(bytes(chunk))
+            head_size += len(chunk)
+            if head_size >= META_CHARSET_SCAN_BYTES:
+                break
+        return b''.join(head), chunks
+    
+    stage = 'read'
+    tick = time.perf_counter()
+    try:
+        first, chunks = open_document()
+        candidates = sniff_encodings(first)
+        for attempt, encoding in enumerate(candidates):
+            if attempt:
+                stage = 'read'
+                first, chunks = open_document()
+            states = {name: ANALYZERS[name].stream(file_path, hash_length) for name in analyzers}
+            parser = StreamingDocumentParser(states.values())
+            decoder = codecs.getincrementaldecoder(encoding)()
+            consumed = 0
+            held_cr = ''
+            try:
+                for chunk in itertools.chain((first,), chunks):
+                    stage = 'decode'
+                    buffered = len(decoder.getstate()[0])
+                    text = held_cr + decoder.decode(chunk)
+                    consumed += len(chunk)
+                    # A \r at the end of a chunk may be the first half of a \r\n
+                    held_cr = '\r' if text.endswith('\r') else ''
+                    if held_cr:
+                        text = text[:-1]
+                    if '\r' in text:
+                        text = text.replace('\r\n', '\n').replace('\r', '\n')
+                    stage = 'parse'
+                    parser.feed(text)
+                    stage = 'read'
+                stage = 'decode'
+                buffered = len(decoder.getstate()[0])
+                text = (held_cr + decoder.decode(b'', final=True)).replace('\r\n', '\n').replace('\r', '\n')
+                stage = 'parse'
+                parser.feed(text)
+                parser.close()
+            except UnicodeDecodeError as e:
+                # Report the byte offset in the whole document, like decode_html()
+                failure = e
+                failure_at = consumed - buffered + e.start
+                continue
+            record_stage(timings, 'stream', tick)
+            return {name: state.finish() for name, state in states.items()}, None
+        
+        stage = 'decode'
+        raise ValueError(f"not decodable as {' or '.join(candidates)} "
+                         f"(last try: {failure.reason} at byte {failure_at})")
+    
     except Exception as e:
-        print(f"Error parsing {file_path}: {e}")
-        return []
+        record_stage(timings, 'stream', tick)
+        return {}, {'file': str(file_path), 'stage': stage, 'error': str(e)}
+
+def stream_html_file(file_path, hash_length=DEFAULT_HASH_LENGTH, timings=None, analyzers=DEFAULT_ANALYZERS):
+    """stream_html_chunks() for a file on disk."""
+    return stream_html_chunks(partial(iter_file_chunks, file_path), file_path, hash_length, timings, analyzers)
 
 def create_unique_key(section_info):
     """Create a unique key for a section based on its classes and content structure (no ID)."""
@@ -147,252 +1147,3030 @@ def create_unique_key(section_info):
     content_hash = section_info['content_hash']
     return f"classes:{classes_str}|content:{content_hash}"
 
-def catalog_sections(root_directory):
-    """Recursively search for HTML files and catalog sections."""
+def rules_fingerprint(parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, stream_threshold=None):
+    """Fingerprint of everything that affects parse_html_file() output, used to invalidate the cache."""
+    rules = {
+        'version': CATALOG_RULES_VERSION,
+        'key_attributes': KEY_ATTRIBUTES,
+        'parser': parser,
+        'content_hash': f'blake2b:{hash_length}',
+    }
+    if stream_threshold is not None and parser != DEFAULT_PARSER:
+        # Streamed files follow html.parser's rules, so with another backend it matters which files stream
+        rules['stream_threshold'] = stream_threshold
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+def file_digest(file_path):
+    """Digest of a file's bytes."""
+    with open(file_path, 'rb') as file:
+        return hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+
+class ParseCache:
+    """On-disk SQLite cache of analyzer results, keyed by path, size, mtime and content digest.
+    
+    Each set of analyzers gets its own database, so a sections-only run and a run with
+    scripts don't keep evicting each other's entries.
+    """
+    
+    def __init__(self, cache_dir, root_path, fingerprint, analyzers=DEFAULT_ANALYZERS):
+        self.root_path = Path(root_path)
+        self.analyzers = analyzers
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        name = 'parse-cache' if tuple(analyzers) == DEFAULT_ANALYZERS else '-'.join(['parse-cache'] + sorted(analyzers))
+        self.connection = sqlite3.connect(str(Path(cache_dir) / f'{name}.sqlite'))
+        self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.hits = 0
+        self.misses = 0
+        
+        # Throw everything away if the signature rules changed since the cache was written
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+        if not row or row[0] != fingerprint:
+            self.connection.execute('DROP TABLE IF EXISTS files')
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rules', ?)", (fingerprint,))
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, results TEXT)'
+        )
+        self.connection.commit()
+    
+    def _key(self, file_path):
+        return os.path.relpath(file_path, self.root_path)
+    
+    def lookup(self, file_path):
+        """Return ({analyzer name: records}, None) on a hit, or (None, pending) where pending is passed to store() after parsing.
+        
+        A file that can't be read any more (e.g. deleted since the walk) is a miss with pending
+        None, so it goes on to be cataloged and reported like any other unreadable file.
+        """
+        key = self._key(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self.misses += 1
+            return None, None
+        row = self.connection.execute(
+            'SELECT size, mtime_ns, digest, results FROM files WHERE path = ?', (key,)
+        ).fetchone()
+        
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            self.hits += 1
+            return self._load(row[3], file_path), None
+        
+        # Size or mtime changed (e.g. a fresh checkout): only re-parse if the bytes changed too
+        try:
+            digest = file_digest(file_path)
+        except OSError:
+            self.misses += 1
+            return None, None
+        if row and row[2] == digest:
+            self.connection.execute(
+                'UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?', (stat.st_size, stat.st_mtime_ns, key)
+            )
+            self.hits += 1
+            return self._load(row[3], file_path), None
+        
+        self.misses += 1
+        return None, (key, stat.st_size, stat.st_mtime_ns, digest)
+    
+    def store(self, pending, result):
+        """Store the analyzer results of a catalog_file() result for a file that missed the cache."""
+        key, size, mtime_ns, digest = pending
+        packed = {name: ANALYZERS[name].pack(result[name]) for name in self.analyzers}
+        self.connection.execute(
+            'INSERT OR REPLACE INTO files (path, size, mtime_ns, digest, results) VALUES (?, ?, ?, ?, ?)',
+            (key, size, mtime_ns, digest, json.dumps(packed, ensure_ascii=False))
+        )
+    
+    def _load(self, results_json, file_path):
+        packed = json.loads(results_json)
+        results = {}
+        for name in self.analyzers:
+            records = results[name] = ANALYZERS[name].unpack(packed[name])
+            # The same tree can be cataloged through different root spellings, so refresh the file field
+            for record in records:
+                record['file'] = str(file_path)
+        return results
+    
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+def might_contain_sections(file_path, analyzers=DEFAULT_ANALYZERS):
+    """Cheap byte-level check that a file could contain a section before paying for a parse.
+    
+    Only answers False when neither a <section> tag nor a class with "section" in it is
+    possible; anything unreadable or UTF-16 encoded is left for the parser to deal with.
+    With other analyzers, answers True if the file could hold anything one of them looks for.
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return data_might_contain_sections(data, analyzers)
+    except (OSError, ValueError):
+        return True
+
+def data_might_contain_sections(data, analyzers=DEFAULT_ANALYZERS):
+    """might_contain_sections() for bytes already in memory (or a mapped file)."""
+    if not len(data):
+        return False
+    if data[:2] in WIDE_ENCODING_BOMS:
+        return True
+    return any(ANALYZERS[name].marker.search(data) is not None for name in analyzers)
+
+def normalize_volatile(data):
+    """Raw HTML with the VOLATILE_PATTERNS masked and whitespace runs collapsed, for --dedup-normalize.
+    
+    Only attribute values are masked, and whitespace inside <script>, <pre> and <textarea>
+    is left alone, so copies still have the same elements, attribute names and text.
+    """
+    for pattern, replacement in VOLATILE_PATTERNS:
+        data = pattern.sub(replacement, data)
+    return WHITESPACE_OR_VERBATIM.sub(lambda match: match.group(1) or b' ', data)
+
+def content_digest(data, mode=DEDUP_EXACT):
+    """Digest that identifies a file's contents for --dedup; with DEDUP_NORMALIZED, after normalize_volatile()."""
+    if mode == DEDUP_NORMALIZED:
+        data = normalize_volatile(data)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def chunks_content_digest(chunks, mode=DEDUP_EXACT, stream_threshold=None):
+    """(content_digest(), size) of contents read as chunks.
+    
+    Exact digests are computed a chunk at a time. With DEDUP_NORMALIZED the chunks are
+    gathered and normalized, except for contents of at least stream_threshold bytes, which
+    are never held whole and so only match their exact copies.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    gathered = [] if mode == DEDUP_NORMALIZED else None
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if gathered is None:
+            hasher.update(chunk)
+            continue
+        gathered.append(chunk)
+        if stream_threshold is not None and size >= stream_threshold:
+            for piece in gathered:
+                hasher.update(piece)
+            gathered = None
+    if gathered is not None:
+        return content_digest(b''.join(gathered), mode), size
+    return hasher.digest(), size
+
+def digest_item(source, item, mode=DEDUP_EXACT, stream_threshold=None):
+    """(digest, size, seconds spent) of a source item for --dedup, or None if it can't be read.
+    
+    Unreadable items are left for the parse, which reports them like without --dedup.
+    """
+    tick = time.perf_counter()
+    try:
+        digest, size = chunks_content_digest(source.chunks(item), mode, stream_threshold)
+    except Exception:
+        return None
+    return digest, size, time.perf_counter() - tick
+
+def digest_items(source, items, mode=DEDUP_EXACT, stream_threshold=None):
+    """digest_item() for a batch of items in a worker process."""
+    return [digest_item(source, item, mode, stream_threshold) for item in items]
+
+def duplicate_result(result, file_name, analyzers=DEFAULT_ANALYZERS, timings=None, size=0):
+    """A catalog_file() result reused for another file with the same contents, with that file's name on every record."""
+    duplicate = dict(result, cached=False, duplicate=True, timings={} if timings is None else timings, bytes=size)
+    for name in set(analyzers) | {'sections'}:
+        duplicate[name] = [dict(record, file=str(file_name)) for record in result[name]]
+    if result['error']:
+        duplicate['error'] = dict(result['error'], file=str(file_name))
+    return duplicate
+
+def catalog_result(analyzers, results=None, error=None, skipped=False, timings=None, size=0):
+    """A catalog_file() result, with the records of every analyzer (empty when it found nothing or didn't run)."""
+    result = {'sections': [], 'error': error, 'skipped': skipped, 'cached': False, 'duplicate': False,
+              'timings': {} if timings is None else timings, 'bytes': size}
+    for name in analyzers:
+        result[name] = results.get(name, []) if results else []
+    return result
+
+def catalog_file(file_path, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, prescan=True,
+                 analyzers=DEFAULT_ANALYZERS, stream_threshold=None):
+    """Parse one file for the catalog.
+    
+    Returns a dict with the records of each analyzer under its name ('sections' is always
+    there, empty if sections weren't asked for), the parse 'error' (or None), whether the
+    byte pre-scan 'skipped' parsing, whether the result was 'cached', the seconds spent per
+    stage ('timings', see try_parse_html_file()) and the file size in 'bytes'.
+    Files of at least stream_threshold bytes are streamed (see stream_html_chunks()) instead
+    of parsed into a tree.
+    """
+    timings = {}
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = 0
+    
+    if prescan:
+        tick = time.perf_counter()
+        contains_sections = might_contain_sections(file_path, analyzers)
+        record_stage(timings, 'prescan', tick)
+        if not contains_sections:
+            return catalog_result(analyzers, skipped=True, timings=timings, size=size)
+    
+    if stream_threshold is not None and size >= stream_threshold:
+        results, error = stream_html_file(file_path, hash_length, timings, analyzers)
+        return catalog_result(analyzers, results, error, timings=timings, size=size)
+    
+    tick = time.perf_counter()
+    try:
+        with open(file_path, 'rb') as file:
+            data = file.read()
+    except Exception as e:
+        record_stage(timings, 'read', tick)
+        return catalog_result(analyzers, error={'file': str(file_path), 'stage': 'read', 'error': str(e)},
+                              timings=timings, size=size)
+    record_stage(timings, 'read', tick)
+    return catalog_data(data, file_path, parser, hash_length, False, timings, analyzers)
+
+def catalog_data(data, file_path, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, prescan=True, timings=None,
+                 analyzers=DEFAULT_ANALYZERS, stream_threshold=None):
+    """catalog_file() for contents already in memory, such as an archive member."""
+    timings = {} if timings is None else timings
+    if prescan:
+        tick = time.perf_counter()
+        contains_sections = data_might_contain_sections(data, analyzers)
+        record_stage(timings, 'prescan', tick)
+        if not contains_sections:
+            return catalog_result(analyzers, skipped=True, timings=timings, size=len(data))
+    
+    if stream_threshold is not None and len(data) >= stream_threshold:
+        # The bytes are already in memory, but the tree of a huge document would be many times their size
+        results, error = stream_html_chunks(partial(iter_data_chunks, data), file_path, hash_length, timings, analyzers)
+    else:
+        results, error = analyze_html_bytes(data, file_path, parser, hash_length, timings, analyzers)
+    return catalog_result(analyzers, results, error, timings=timings, size=len(data))
+
+def catalog_file_packed(file_path, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, prescan=True,
+                        analyzers=DEFAULT_ANALYZERS, stream_threshold=None):
+    """catalog_file() for worker processes, with the records passed through pack_results()."""
+    return pack_results(catalog_file(file_path, parser, hash_length, prescan, analyzers, stream_threshold), analyzers)
+
+def catalog_files_packed(file_paths, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, prescan=True,
+                         analyzers=DEFAULT_ANALYZERS, stream_threshold=None):
+    """catalog_file_packed() for a batch of files, to keep the per-task overhead of the pool down."""
+    return [catalog_file_packed(file_path, parser, hash_length, prescan, analyzers, stream_threshold)
+            for file_path in file_paths]
+
+class FileSource:
+    """Where iter_parsed_files() gets file contents from: files on disk, with paths as items.
+    
+    Sources turn an item into its file identifier (name()), catalog one item in this process
+    (catalog()), read its bytes a chunk at a time for --dedup (chunks()) and provide a
+    picklable function that catalogs a batch of items in a worker process and returns
+    catalog_file_packed() results (batch_task()).
+    """
+    
+    def name(self, item):
+        return item
+    
+    def catalog(self, item, **options):
+        return catalog_file(item, **options)
+    
+    def chunks(self, item):
+        return iter_file_chunks(item)
+    
+    def batch_task(self):
+        return catalog_files_packed
+    
+    def close(self):
+        pass
+
+# Zip archives already opened, by (process ID, path), so each worker process opens each one only
+# once. A forked worker must never read through a handle it inherited: the file offset is shared
+# with the parent and every other worker, and interleaved reads return corrupt data.
+OPEN_ZIP_ARCHIVES = {}
+
+def open_zip_archive(archive_path):
+    """This process's own ZipFile for archive_path, opened on first use."""
+    key = (os.getpid(), archive_path)
+    archive = OPEN_ZIP_ARCHIVES.get(key)
+    if archive is None:
+        archive = OPEN_ZIP_ARCHIVES[key] = zipfile.ZipFile(archive_path)
+    return archive
+
+def iter_zip_member_chunks(archive_path, member_name, chunk_size=STREAM_CHUNK_BYTES):
+    """A zip member's bytes, chunk_size at a time, decompressed as they are read."""
+    with open_zip_archive(archive_path).open(member_name) as member:
+        while True:
+            chunk = member.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def catalog_zip_member(archive_path, member_name, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, prescan=True,
+                       analyzers=DEFAULT_ANALYZERS, stream_threshold=None):
+    """catalog_file() for one member of a zip archive, read straight from the archive."""
+    # Identify members without a leading ./, the way the walker spells paths
+    file_name = member_name.removeprefix('./')
+    timings = {}
+    tick = time.perf_counter()
+    try:
+        data = open_zip_archive(archive_path).read(member_name)
+    except Exception as e:
+        record_stage(timings, 'read', tick)
+        return catalog_result(analyzers, error={'file': file_name, 'stage': 'read', 'error': str(e)}, timings=timings)
+    record_stage(timings, 'read', tick)
+    return catalog_data(data, file_name, parser, hash_length, prescan, timings, analyzers, stream_threshold)
+
+def catalog_zip_members_packed(archive_path, member_names, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH,
+                               prescan=True, analyzers=DEFAULT_ANALYZERS, stream_threshold=None):
+    """catalog_zip_member() for a batch of members in a worker process, with packed records."""
+    return [pack_results(catalog_zip_member(archive_path, member_name, parser, hash_length, prescan, analyzers,
+                                            stream_threshold), analyzers)
+            for member_name in member_names]
+
+def catalog_members_packed(members, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH, prescan=True,
+                           analyzers=DEFAULT_ANALYZERS, stream_threshold=None):
+    """catalog_data() for a batch of (name, contents) pairs in a worker process, with packed records."""
+    return [pack_results(catalog_data(data, member_name, parser, hash_length, prescan, None, analyzers,
+                                      stream_threshold), analyzers)
+            for member_name, data in members]
+
+def archive_member_selected(member_name, extension_patterns, include, exclude):
+    """Whether an archive member passes the same extension, include and exclude rules as walk_html_files()."""
+    parts = member_name.split('/')
+    for depth in range(1, len(parts)):
+        if matches_patterns('/'.join(parts[:depth]), parts[depth - 1], True, exclude):
+            return False
+    name = parts[-1]
+    if not any(fnmatch.fnmatch(name, pattern) for pattern in extension_patterns):
+        return False
+    if exclude and matches_patterns(member_name, name, False, exclude):
+        return False
+    if include and not matches_patterns(member_name, name, False, include):
+        return False
+    return True
+
+class ZipSource(FileSource):
+    """Members of a zip archive; items are member names, which workers read from the archive themselves."""
+    
+    def __init__(self, archive_path, extensions=None, include=None, exclude=None, default_excludes=True):
+        self.archive_path = str(archive_path)
+        self.extension_patterns = ['*' + extension for extension in extensions or DEFAULT_EXTENSIONS]
+        self.include = include or []
+        self.exclude = list(exclude or []) + (DEFAULT_EXCLUDES if default_excludes else [])
+    
+    def items(self):
+        """Selected member names, in archive order.
+        
+        The listing is read and the archive closed before the first name is handed out, so
+        no open handle is around when worker processes fork.
+        """
+        with zipfile.ZipFile(self.archive_path) as archive:
+            infos = archive.infolist()
+        for info in infos:
+            member_name = info.filename.removeprefix('./')
+            if not info.is_dir() and archive_member_selected(member_name, self.extension_patterns,
+                                                             self.include, self.exclude):
+                yield info.filename
+    
+    def name(self, item):
+        return item.removeprefix('./')
+    
+    def catalog(self, item, **options):
+        return catalog_zip_member(self.archive_path, item, **options)
+    
+    def chunks(self, item):
+        return iter_zip_member_chunks(self.archive_path, item)
+    
+    def batch_task(self):
+        return partial(catalog_zip_members_packed, self.archive_path)
+    
+    def close(self):
+        archive = OPEN_ZIP_ARCHIVES.pop((os.getpid(), self.archive_path), None)
+        if archive:
+            archive.close()
+
+class TarSource(FileSource):
+    """Members of a (possibly compressed) tar archive, read as one stream; items are (name, contents) pairs.
+    
+    A tar can only be read front to back, so the main process decompresses it and hands the
+    member contents to the workers.
+    """
+    
+    def __init__(self, archive_path, extensions=None, include=None, exclude=None, default_excludes=True):
+        self.archive_path = str(archive_path)
+        self.extension_patterns = ['*' + extension for extension in extensions or DEFAULT_EXTENSIONS]
+        self.include = include or []
+        self.exclude = list(exclude or []) + (DEFAULT_EXCLUDES if default_excludes else [])
+    
+    def items(self):
+        """(member name, contents) for each selected member, in archive order."""
+        with open(self.archive_path, 'rb') as raw:
+            if self.archive_path.endswith(ZSTD_SUFFIXES):
+                if zstandard is None:
+                    raise ValueError(f"{self.archive_path} is zstd-compressed; pip install zstandard to read it")
+                stream = zstandard.ZstdDecompressor().stream_reader(raw)
+                mode = 'r|'
+            else:
+                stream = raw
+                mode = 'r|*'
+            with tarfile.open(fileobj=stream, mode=mode) as archive:
+                for member in archive:
+                    member_name = member.name.removeprefix('./')
+                    if not member.isfile() or not archive_member_selected(member_name, self.extension_patterns,
+                                                                          self.include, self.exclude):
+                        continue
+                    yield member_name, archive.extractfile(member).read()
+    
+    def name(self, item):
+        return item[0]
+    
+    def catalog(self, item, **options):
+        return catalog_data(item[1], item[0], **options)
+    
+    def chunks(self, item):
+        return iter_data_chunks(item[1])
+    
+    def batch_task(self):
+        return catalog_members_packed
+
+def is_archive(path):
+    """Whether a path is an archive file that can be cataloged instead of a directory."""
+    return str(path).lower().endswith(ZIP_SUFFIXES + TAR_SUFFIXES) and os.path.isfile(path)
+
+def open_archive_source(archive_path, extensions=None, include=None, exclude=None, default_excludes=True):
+    """The ZipSource or TarSource for an archive path."""
+    source_class = ZipSource if str(archive_path).lower().endswith(ZIP_SUFFIXES) else TarSource
+    return source_class(archive_path, extensions, include, exclude, default_excludes)
+
+def iter_in_order(executor, entries, task, batch_size=PARSE_BATCH_SIZE,
+                  max_queued=PARSE_BATCH_SIZE * PARSE_BATCHES_IN_FLIGHT):
+    """Yield (key, output) for each (key, item) of `entries`, in order, running task on the items in worker batches.
+    
+    task takes a list of items and returns one output per item. Entries whose item is None
+    get None without a trip to a worker. `entries` is consumed lazily, at most max_queued
+    entries ahead of the one being yielded.
+    """
+    # Entries waiting to be yielded: [key, item, batch future, index in batch]
+    queue = deque()
+    batch = []
+    
+    def submit_batch():
+        future = executor.submit(task, [slot[1] for slot in batch])
+        for index, slot in enumerate(batch):
+            slot[2] = future
+            slot[3] = index
+        batch.clear()
+    
+    def pop_output():
+        slot = queue.popleft()
+        if slot[1] is None:
+            return slot[0], None
+        if slot[2] is None:
+            submit_batch()
+        return slot[0], slot[2].result()[slot[3]]
+    
+    for key, item in entries:
+        slot = [key, item, None, None]
+        queue.append(slot)
+        if item is not None:
+            batch.append(slot)
+            if len(batch) >= batch_size:
+                submit_batch()
+        while len(queue) > max_queued:
+            yield pop_output()
+    
+    if batch:
+        submit_batch()
+    while queue:
+        yield pop_output()
+
+def iter_parsed_files(html_files, jobs=1, cache=None, parser=DEFAULT_PARSER, hash_length=DEFAULT_HASH_LENGTH,
+                      prescan=True, stats=None, source=None, analyzers=DEFAULT_ANALYZERS, stream_threshold=None,
+                      dedup=None, lookahead=None):
+    """Yield (file, result) pairs in walk order, parsing across `jobs` worker processes.
+    
+    Each result is a catalog_file() dict. Files with an up-to-date entry in `cache` are
+    loaded instead of parsed. `html_files` is consumed lazily, so parsing starts while the
+    walk is still running. Time spent in the cache is added to the 'cache' stage of `stats`.
+    `html_files` holds items of `source` (default: paths of files on disk, see FileSource).
+    Every file is parsed once for all of `analyzers` (see ANALYZERS), or streamed if it is at
+    least stream_threshold bytes.
+    With dedup (DEDUP_EXACT or DEDUP_NORMALIZED), every file that missed the cache is hashed
+    first, by the workers if there are any (see digest_item()). Only the first file with a
+    digest is parsed; the ones after it reuse its result under their own name. The digests
+    seen and their first results are kept for the whole run, so a copy is never parsed
+    again, however far apart in the walk it is.
+    With workers, up to `lookahead` files per worker (default: PARSE_BATCHES_IN_FLIGHT
+    batches) are taken from `html_files` before the oldest one is yielded, and as many again
+    for hashing with dedup. A consumer that decides from the results when `html_files` ends,
+    like SaturationSampler, wants it small.
+    """
+    options = {'parser': parser, 'hash_length': hash_length, 'prescan': prescan, 'analyzers': analyzers,
+               'stream_threshold': stream_threshold}
+    stats = stats or RunStats()
+    source = source or FileSource()
+    # Content digest -> result of the first file with it (None until that file is parsed), for dedup
+    first_results = {}
+    
+    def lookup(html_file):
+        if not cache:
+            return None, None
+        with stats.stage('cache'):
+            results, pending_entry = cache.lookup(html_file)
+        if results is not None:
+            result = catalog_result(analyzers, results)
+            result['cached'] = True
+            return result, None
+        return None, pending_entry
+    
+    def claim(digest):
+        """Whether a file with this digest (from digest_item()) is the first and has to be parsed."""
+        if digest is None:
+            return True
+        if digest[0] in first_results:
+            return False
+        first_results[digest[0]] = None
+        return True
+    
+    def settle(html_file, result, digest):
+        """Keep the first result for a digest, or build a copy's result from it when `result` is None."""
+        if digest is None:
+            return result
+        content, size, seconds = digest
+        if result is None:
+            result = duplicate_result(first_results[content], source.name(html_file), analyzers, size=size)
+        else:
+            first_results[content] = result
+        result['timings']['dedup'] = seconds
+        return result
+    
+    def finish(html_file, result, pending_entry):
+        if cache and pending_entry is not None and not result['cached'] and not result['error']:
+            # Failed parses are not cached so they are retried (and reported) next run
+            with stats.stage('cache'):
+                cache.store(pending_entry, result)
+        return source.name(html_file), result
+    
+    if jobs == 1:
+        for html_file in html_files:
+            result, pending_entry = lookup(html_file)
+            digest = None
+            if result is None and dedup:
+                digest = digest_item(source, html_file, dedup, stream_threshold)
+            if result is None and claim(digest):
+                result = source.catalog(html_file, **options)
+            yield finish(html_file, settle(html_file, result, digest), pending_entry)
+        return
+    
+    workers = jobs or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers)
+    lookahead = lookahead or PARSE_BATCH_SIZE * PARSE_BATCHES_IN_FLIGHT
+    in_order = partial(iter_in_order, executor, batch_size=min(PARSE_BATCH_SIZE, lookahead),
+                       max_queued=workers * lookahead)
+    
+    # Entries are ((file, cached result, pending cache entry, digest), item for the workers or None)
+    def looked_up():
+        for html_file in html_files:
+            result, pending_entry = lookup(html_file)
+            yield (html_file, result, pending_entry, None), html_file if result is None else None
+    
+    def claimed(hashed):
+        for (html_file, result, pending_entry, _), digest in hashed:
+            yield (html_file, result, pending_entry, digest), html_file if result is None and claim(digest) else None
+    
+    entries = looked_up()
+    if dedup:
+        entries = claimed(in_order(entries, partial(digest_items, source, mode=dedup, stream_threshold=stream_threshold)))
+    
+    # Results are yielded strictly in walk order, so the output is identical to a serial run
+    try:
+        for (html_file, result, pending_entry, digest), packed in in_order(entries,
+                                                                           partial(source.batch_task(), **options)):
+            if packed is not None:
+                # Signature IDs are per process, so re-intern each worker's results here
+                result = unpack_results(packed, analyzers)
+            yield finish(html_file, settle(html_file, result, digest), pending_entry)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+def read_ignore_file(root_directory):
+    """Exclude patterns from the root's .catalogignore (one per line, # starts a comment)."""
+    ignore_path = os.path.join(root_directory, CATALOG_IGNORE_FILE)
+    if not os.path.isfile(ignore_path):
+        return []
+    
+    patterns = []
+    with open(ignore_path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                patterns.append(line)
+    return patterns
+
+def matches_patterns(relative_path, name, is_dir, patterns):
+    """Whether a path matches any glob pattern.
+    
+    Patterns containing a slash match the path relative to the root (blog/**); others
+    match the file or directory name at any depth (*.amp.html). A trailing slash limits
+    a pattern to directories.
+    """
+    for pattern in patterns:
+        if pattern.endswith('/'):
+            if not is_dir:
+                continue
+            pattern = pattern.rstrip('/')
+        if '/' in pattern:
+            if fnmatch.fnmatch(relative_path, pattern.lstrip('/')):
+                return True
+        elif fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+def walk_html_files(root_directory, extensions=None, include=None, exclude=None, default_excludes=True):
+    """Yield the paths of HTML files under a directory, pruning excluded directories before descending.
+    
+    Files come out in the same order as Path.rglob(): each directory's files, then its
+    subdirectories, in os.scandir() order. Paths are yielded as strings the moment they are
+    found, so callers can start on them before the walk finishes. Symlinked directories are
+    not followed.
+    """
+    extensions = extensions or DEFAULT_EXTENSIONS
+    extension_patterns = ['*' + extension for extension in extensions]
+    exclude = list(exclude or [])
+    if default_excludes:
+        exclude += DEFAULT_EXCLUDES
+    exclude += read_ignore_file(root_directory)
+    include = include or []
+    
+    # Match Path's spelling of paths: no leading ./ when walking the current directory
+    root = str(Path(root_directory))
+    prefix = '' if root == '.' else os.path.join(root, '')
+    
+    pending_dirs = ['']
+    while pending_dirs:
+        relative_dir = pending_dirs.pop()
+        subdirs = []
+        try:
+            with os.scandir(prefix + relative_dir if prefix or relative_dir else '.') as entries:
+                for entry in entries:
+                    relative_path = relative_dir + entry.name
+                    try:
+                        is_dir = entry.is_dir() and not entry.is_symlink()
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if not matches_patterns(relative_path, entry.name, True, exclude):
+                            subdirs.append(relative_path + '/')
+                        continue
+                    if not any(fnmatch.fnmatch(entry.name, pattern) for pattern in extension_patterns):
+                        continue
+                    if exclude and matches_patterns(relative_path, entry.name, False, exclude):
+                        continue
+                    if include and not matches_patterns(relative_path, entry.name, False, include):
+                        continue
+                    yield prefix + relative_path
+        except OSError:
+            continue
+        # Depth-first, first subdirectory first
+        pending_dirs.extend(reversed(subdirs))
+
+def get_structure_key(section):
+    """Key sections are grouped by in the catalog (classes only, no ID or content)."""
+    classes_str = ' '.join(sorted(section['classes']))
+    return f"classes:{classes_str}"
+
+class FileTable:
+    """Dense integer IDs for cataloged files, so sets of files can be stored as int bitsets.
+    
+    Bit i of a mask is set when the file with ID i is in the set. Paths are only turned back
+    into names when a report is rendered.
+    """
+    
+    def __init__(self):
+        self.ids = {}
+        self.paths = []
+    
+    def add(self, file_path):
+        """ID for a file path, assigning the next one if the path is new."""
+        file_path = str(file_path)
+        file_id = self.ids.get(file_path)
+        if file_id is None:
+            file_id = self.ids[file_path] = len(self.paths)
+            self.paths.append(file_path)
+        return file_id
+    
+    def iter_ids(self, mask):
+        """File IDs set in a mask, lowest first."""
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
+    
+    def paths_for(self, mask):
+        """Paths of the files in a mask, in ID (walk) order."""
+        return [self.paths[file_id] for file_id in self.iter_ids(mask)]
+    
+    def names_for(self, mask, names=None):
+        """Sorted names of the files in a mask, looked up in `names` (see display_names()) when given."""
+        if names is None:
+            names = display_names(self.paths_for(mask))
+        return sorted(names[file_path] for file_path in self.paths_for(mask))
+
+class StructureGroup:
+    """Running aggregate of every section that shares a structure key.
+    
+    Sections are folded in as soon as their file is parsed and then dropped, so only what
+    the reports and the JSON output need is kept: per file its occurrences and first section,
+    the child -> files bitsets and one content analysis per distinct content hash. Keeping it
+    per file means a file's sections can be taken out again with remove_file().
+    """
+    
+    def __init__(self, file_table):
+        self.file_table = file_table
+        # Files this structure appears in, and for each unique child the files that contain it
+        self.file_mask = 0
+        self.children_to_files = {}
+        # File ID -> {'first': (ordinal, classes, tag, content_hash), 'occurrences': [...]}, in the order added
+        self.files = {}
+        # Content hash -> representative content analysis and, per file ID, [occurrences, first ordinal]
+        self.variants = {}
+    
+    def add(self, section, file_id, ordinal=0):
+        """Fold one parsed section (the ordinal-th of its file) from the file with the given FileTable ID into the group."""
+        file_bit = 1 << file_id
+        self.file_mask |= file_bit
+        
+        # Map each unique child to the files that contain it
+        children_to_files = self.children_to_files
+        for child in section['content_analysis']['unique_children']:
+            children_to_files[child] = children_to_files.get(child, 0) | file_bit
+        
+        file_entry = self.files.get(file_id)
+        if file_entry is None:
+            file_entry = self.files[file_id] = {
+                'first': (ordinal, section['classes'], section['tag'], section['content_hash']),
+                'occurrences': []
+            }
+        file_entry['occurrences'].append({
+            'file': section['file'],
+            'all_attributes': section['attributes']
+        })
+        
+        variant = self.variants.get(section['content_hash'])
+        if variant is None:
+            variant = self.variants[section['content_hash']] = {
+                'content_analysis': section['content_analysis'],
+                'files': {}
+            }
+        file_count = variant['files'].get(file_id)
+        if file_count is None:
+            variant['files'][file_id] = [1, ordinal]
+        else:
+            file_count[0] += 1
+    
+    def remove_file(self, file_id):
+        """Take every section of one file back out of the group."""
+        if self.files.pop(file_id, None) is None:
+            return
+        file_bit = 1 << file_id
+        self.file_mask &= ~file_bit
+        
+        for child, mask in list(self.children_to_files.items()):
+            if mask & file_bit:
+                if mask == file_bit:
+                    del self.children_to_files[child]
+                else:
+                    self.children_to_files[child] = mask & ~file_bit
+        
+        for content_hash, variant in list(self.variants.items()):
+            variant['files'].pop(file_id, None)
+            if not variant['files']:
+                del self.variants[content_hash]
+    
+    def ordered_file_ids(self, ranks=None):
+        """File IDs in the order they were added, or by their rank in `ranks` (file ID -> walk position)."""
+        if ranks is None:
+            return list(self.files)
+        return sorted(self.files, key=ranks.__getitem__)
+    
+    def sort_key(self, ranks):
+        """Where the group's first section sits in walk order: (file rank, section ordinal)."""
+        file_id = min(self.files, key=ranks.__getitem__)
+        return ranks[file_id], self.files[file_id]['first'][0]
+    
+    def ordered_variants(self, ranks=None):
+        """(content hash, variant) pairs in first-seen order: as added, or by (file rank, section ordinal)."""
+        if ranks is None:
+            return list(self.variants.items())
+        
+        def first_seen(item):
+            file_id = min(item[1]['files'], key=ranks.__getitem__)
+            return ranks[file_id], item[1]['files'][file_id][1]
+        return sorted(self.variants.items(), key=first_seen)
+    
+    def to_entry(self, ranks=None):
+        """The catalog entry for this group.
+        
+        children_to_files maps each child to a file bitset; resolve it with file_table.
+        Files are listed in the order they were added unless `ranks` gives a walk order.
+        """
+        file_ids = self.ordered_file_ids(ranks)
+        file_paths = self.file_table.paths
+        _, classes, tag, content_hash = self.files[file_ids[0]]['first']
+        
+        variants = []
+        for variant_hash, variant in self.ordered_variants(ranks):
+            variant_files = variant['files']
+            first_file = min(variant_files, key=ranks.__getitem__) if ranks is not None else next(iter(variant_files))
+            variants.append({
+                'content_hash': variant_hash,
+                'content_analysis': variant['content_analysis'],
+                'first_seen_in': file_paths[first_file],
+                'occurrences': sum(count for count, _ in variant_files.values())
+            })
+        
+        return {
+            'classes': classes,
+            'tag': tag,  # Include tag info
+            'content_hash': content_hash,
+            'content_analysis': self.variants[content_hash]['content_analysis'],
+            'unique_children': sorted(list(self.children_to_files.keys())),
+            'children_to_files': self.children_to_files,
+            'file_mask': self.file_mask,
+            'file_table': self.file_table,
+            'first_seen_in': file_paths[file_ids[0]],
+            'occurrences': [occurrence for file_id in file_ids for occurrence in self.files[file_id]['occurrences']],
+            'variants': variants
+        }
+
+class SectionCatalog:
+    """Structure groups for a set of files, which can be updated one file at a time.
+    
+    add_file() folds a file's parsed sections in and remove_file() takes them out again, so
+    a changed file can be swapped without re-cataloging the rest of the site (see --watch).
+    """
+    
+    def __init__(self):
+        self.file_table = FileTable()
+        self.groups = {}
+        # File ID -> structure keys it contributed to, so removal only touches those groups
+        self.file_groups = {}
+    
+    def add_file(self, file_path, sections):
+        """Add one file's sections (footers excluded) and return the file's ID."""
+        file_id = self.file_table.add(file_path)
+        structure_keys = {}
+        for ordinal, section in enumerate(sections):
+            # Skip sections with 'footer' class
+            if 'footer' in section['classes']:
+                continue
+            # Group by classes only (no ID)
+            structure_key = get_structure_key(section)
+            
+            group = self.groups.get(structure_key)
+            if group is None:
+                group = self.groups[structure_key] = StructureGroup(self.file_table)
+            group.add(section, file_id, ordinal)
+            structure_keys[structure_key] = True
+        if structure_keys:
+            self.file_groups[file_id] = list(structure_keys)
+        return file_id
+    
+    def remove_file(self, file_path):
+        """Remove everything a file contributed; groups left without files are dropped."""
+        file_id = self.file_table.ids.get(str(file_path))
+        if file_id is None:
+            return
+        for structure_key in self.file_groups.pop(file_id, []):
+            group = self.groups[structure_key]
+            group.remove_file(file_id)
+            if not group.files:
+                del self.groups[structure_key]
+    
+    def entries(self, walk_order=None):
+        """The unique_sections dict for the reports and JSON output.
+        
+        Without walk_order, groups and files come out in the order they were added, which
+        is walk order for a one-off run. After incremental updates pass the current list of
+        file paths in walk order, so the result matches cataloging the site from scratch.
+        """
+        if walk_order is None:
+            return {structure_key: group.to_entry() for structure_key, group in self.groups.items()}
+        
+        file_ids = self.file_table.ids
+        ranks = {file_ids[str(file_path)]: rank for rank, file_path in enumerate(walk_order) if str(file_path) in file_ids}
+        groups = sorted(self.groups.items(), key=lambda item: item[1].sort_key(ranks))
+        return {structure_key: group.to_entry(ranks) for structure_key, group in groups}
+
+def get_script_key(script):
+    """Key scripts are grouped by: the src of an external script, the body digest of an inline one."""
+    if script['src']:
+        return f"src:{script['src']}"
+    return f"inline:{script['digest']}"
+
+class ScriptCatalog:
+    """Scripts from ScriptAnalyzer grouped by get_script_key(), updatable one file at a time like SectionCatalog."""
+    
+    def __init__(self):
+        self.file_table = FileTable()
+        # Script key -> {file ID: [(ordinal in the file, script), ...]}, files in the order added
+        self.groups = {}
+        # File ID -> script keys it contributed to
+        self.file_groups = {}
+        # Every file currently cataloged, scripts or not, to tell which scripts are on every page
+        self.file_ids = set()
+    
+    def add_file(self, file_path, scripts):
+        """Add one file's scripts and return the file's ID."""
+        file_id = self.file_table.add(file_path)
+        self.file_ids.add(file_id)
+        script_keys = {}
+        for ordinal, script in enumerate(scripts):
+            script_key = get_script_key(script)
+            self.groups.setdefault(script_key, {}).setdefault(file_id, []).append((ordinal, script))
+            script_keys[script_key] = True
+        if script_keys:
+            self.file_groups[file_id] = list(script_keys)
+        return file_id
+    
+    def remove_file(self, file_path):
+        """Remove everything a file contributed; scripts left without files are dropped."""
+        file_id = self.file_table.ids.get(str(file_path))
+        if file_id is None:
+            return
+        self.file_ids.discard(file_id)
+        for script_key in self.file_groups.pop(file_id, []):
+            group = self.groups[script_key]
+            del group[file_id]
+            if not group:
+                del self.groups[script_key]
+    
+    def file_count(self):
+        return len(self.file_ids)
+    
+    def entries(self, walk_order=None):
+        """The unique_scripts dict for the scripts report and JSON output, most widespread first.
+        
+        Scripts found in as many files keep first-seen order: the order they were added, or
+        their place in walk_order after incremental updates (see SectionCatalog.entries()).
+        """
+        ranks = None
+        if walk_order is not None:
+            file_ids = self.file_table.ids
+            ranks = {file_ids[str(file_path)]: rank for rank, file_path in enumerate(walk_order) if str(file_path) in file_ids}
+        
+        ordered = []
+        for index, (script_key, group) in enumerate(self.groups.items()):
+            if ranks is None:
+                file_ids = list(group)
+                first_seen = (index, 0)
+            else:
+                file_ids = sorted(group, key=ranks.__getitem__)
+                first_seen = (ranks[file_ids[0]], group[file_ids[0]][0][0])
+            ordered.append((-len(file_ids), first_seen, script_key, file_ids))
+        ordered.sort(key=lambda item: item[:2])
+        
+        unique_scripts = {}
+        for _, _, script_key, file_ids in ordered:
+            group = self.groups[script_key]
+            scripts = [script for file_id in file_ids for _, script in group[file_id]]
+            first = scripts[0]
+            unique_scripts[script_key] = {
+                'kind': 'external' if first['src'] else 'inline',
+                'src': first['src'],
+                'digest': first['digest'],
+                'size': first['size'],
+                'preview': first['preview'],
+                'file_count': len(file_ids),
+                'loading': dict(Counter(script['loading'] for script in scripts)),
+                'positions': dict(Counter(script['position'] for script in scripts)),
+                'types': dict(Counter(script['type'] for script in scripts)),
+                'first_seen_in': first['file'],
+                'occurrences': [{'file': script['file'], 'position': script['position'], 'loading': script['loading'],
+                                 'all_attributes': script['attributes']} for script in scripts]
+            }
+        return unique_scripts
+
+class RunStats:
+    """Where a catalog run spends its time: stage timers, per-file latencies and throughput.
+    
+    Per-file stages ('read', 'parse', ...) come from catalog_file() and are summed over all
+    workers, so with --jobs they can add up to more than the wall time. Latencies are bucketed
+    by powers of two milliseconds.
+    """
+    
+    def __init__(self, slowest=DEFAULT_SLOWEST_FILES):
+        self.started = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.histogram = Counter()
+        self.keep_slowest = slowest
+        # Min-heap of (seconds, file) so the fastest of the kept files is dropped first
+        self.slowest = []
+        self.files = 0
+        self.parsed_files = 0
+        self.cached_files = 0
+        self.duplicate_files = 0
+        self.skipped_files = 0
+        self.failed_files = 0
+        self.bytes = 0
+        self.sections = 0
+    
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - started
+    
+    def timed_iter(self, name, iterable):
+        """Yield from iterable, counting the time spent producing each item towards stage `name`."""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.stages[name] += time.perf_counter() - started
+            yield item
+    
+    def add_file(self, file_path, result):
+        """Record one catalog_file() result."""
+        self.files += 1
+        self.bytes += result.get('bytes', 0)
+        self.sections += len(result['sections'])
+        if result['cached']:
+            self.cached_files += 1
+        elif result['duplicate']:
+            self.duplicate_files += 1
+        elif result['skipped']:
+            self.skipped_files += 1
+        else:
+            self.parsed_files += 1
+        if result['error']:
+            self.failed_files += 1
+        
+        timings = result.get('timings', {})
+        for stage, seconds in timings.items():
+            self.stages[stage] += seconds
+        if result['cached'] or result['duplicate']:
+            return
+        
+        latency = sum(timings.values())
+        self.histogram[int(latency * 1000).bit_length()] += 1
+        entry = (latency, str(file_path))
+        if len(self.slowest) < self.keep_slowest:
+            heapq.heappush(self.slowest, entry)
+        elif self.keep_slowest:
+            heapq.heappushpop(self.slowest, entry)
+    
+    def elapsed(self):
+        return time.perf_counter() - self.started
+    
+    def to_dict(self):
+        """JSON-ready stats for --stats-json."""
+        elapsed = self.elapsed()
+        histogram = []
+        for bucket in sorted(self.histogram):
+            low = 0 if bucket == 0 else 2 ** (bucket - 1)
+            histogram.append({'min_ms': low, 'max_ms': 2 ** bucket, 'files': self.histogram[bucket]})
+        
+        return {
+            'elapsed_seconds': round(elapsed, 4),
+            'files': self.files,
+            'parsed_files': self.parsed_files,
+            'cached_files': self.cached_files,
+            'duplicate_files': self.duplicate_files,
+            'skipped_files': self.skipped_files,
+            'failed_files': self.failed_files,
+            'bytes': self.bytes,
+            'files_per_second': round(self.files / elapsed, 1) if elapsed else None,
+            'bytes_per_second': round(self.bytes / elapsed) if elapsed else None,
+            'stages': {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            'latency_histogram': histogram,
+            'slowest_files': [{'file': file_path, 'seconds': round(seconds, 4)}
+                              for seconds, file_path in sorted(self.slowest, reverse=True)]
+        }
+    
+    def print_summary(self):
+        """Short stage breakdown for the console."""
+        elapsed = self.elapsed()
+        print(f"\nTime by stage ({elapsed:.2f}s wall, {self.files / elapsed if elapsed else 0:.1f} files/sec, "
+              f"{self.bytes / 1048576 / elapsed if elapsed else 0:.2f} MB/sec):")
+        for stage, seconds in sorted(self.stages.items(), key=lambda item: item[1], reverse=True):
+            print(f"  {stage:<12} {seconds:>9.3f}s")
+        if self.slowest:
+            print("Slowest files:")
+            for seconds, file_path in sorted(self.slowest, reverse=True)[:5]:
+                print(f"  {seconds * 1000:>9.1f}ms  {file_path}")
+
+class ProgressLine:
+    """Rate-limited 'files processed' line on stderr, rewritten in place on a terminal."""
+    
+    def __init__(self, stats, interval=PROGRESS_INTERVAL, stream=None):
+        self.stats = stats
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.interactive = self.stream.isatty()
+        # The first update waits a full interval, so quick runs print no progress at all
+        self.last_update = stats.started
+        self.shown = False
+    
+    def update(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self.last_update < self.interval:
+            return
+        self.last_update = now
+        elapsed = self.stats.elapsed()
+        line = (f"Processed {self.stats.files:,} files ({self.stats.bytes / 1048576:.1f} MB), "
+                f"{self.stats.files / elapsed if elapsed else 0:.1f} files/sec")
+        if self.interactive:
+            self.stream.write('\r' + line + '\x1b[K')
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+        self.shown = True
+    
+    def close(self):
+        if self.shown:
+            self.update(force=True)
+            if self.interactive:
+                self.stream.write('\n')
+                self.stream.flush()
+
+def catalog_sections(root_directory, jobs=1, cache_dir=None, parser=DEFAULT_PARSER,
+                     hash_length=DEFAULT_HASH_LENGTH, prescan=True, errors=None, html_files=None,
+                     stats=None, verbose=False, catalog=None, source=None, analyzers=DEFAULT_ANALYZERS, catalogs=None,
+                     stream_threshold=None, dedup=None, lookahead=None):
+    """Recursively search for HTML files and catalog sections.
+    
+    html_files defaults to walk_html_files(root_directory); pass another iterable of paths
+    (for example a filtered walk) to catalog those instead.
+    With jobs > 1 (or 0 for one worker per CPU) files are parsed in a process pool.
+    With a cache_dir, unchanged files are loaded from the parse cache instead of re-parsed.
+    With prescan, files whose bytes can't contain a section are skipped without parsing.
+    Files that can't be read, decoded or parsed are appended to `errors` (see try_parse_html_file()).
+    Timings are collected into `stats` (a RunStats). Progress is shown as a rate-limited line
+    on stderr, or with verbose as one "Processing:" line per file.
+    Sections are grouped into `catalog` (a SectionCatalog) if given, so the caller can keep
+    updating it afterwards.
+    root_directory can also be a .zip, .tar, .tar.gz or .tar.zst archive, whose members are
+    read without extracting anything and identified by their path inside the archive. To
+    pass a filtered list of members, give html_files together with the archive's `source`.
+    Each file is parsed once and handed to every analyzer in `analyzers` (see ANALYZERS);
+    each analyzer's records are also added to the matching catalog in `catalogs`, e.g.
+    {'scripts': ScriptCatalog()}, or {'sections': SaturationSampler(...)} to watch the sections.
+    Files of at least stream_threshold bytes are streamed through an event parser instead
+    of parsed into a tree, so one huge document can't take all the memory (see
+    stream_html_chunks()).
+    With dedup (DEDUP_EXACT or DEDUP_NORMALIZED), files are hashed first and each distinct
+    content is parsed once; its copies reuse that result under their own name (see
+    iter_parsed_files()).
+    lookahead limits how many files per worker are parsed ahead (see iter_parsed_files()).
+    """
     root_path = Path(root_directory)
     
     if not root_path.exists():
         print(f"Error: Directory '{root_directory}' does not exist.")
         return {}
     
-    # Dictionary to store sections grouped by classes only
-    sections_by_structure = defaultdict(list)
+    # Running aggregates of sections grouped by classes only
+    catalog = catalog if catalog is not None else SectionCatalog()
     file_count = 0
+    skipped_count = 0
+    duplicate_count = 0
+    failed_files = []
     total_sections = 0
     
+    stats = stats or RunStats()
+    progress = None if verbose else ProgressLine(stats)
+    owned_source = None
+    if source is None and is_archive(root_directory):
+        source = owned_source = open_archive_source(root_directory)
+    if source is not None and cache_dir:
+        # The cache is keyed by file stats, which archive members don't have on disk
+        print("Note: the parse cache is not used for archives")
+        cache_dir = None
+    fingerprint = rules_fingerprint(parser, hash_length, stream_threshold)
+    cache = ParseCache(cache_dir, root_path, fingerprint, analyzers) if cache_dir else None
+    
     # Recursively find all HTML files
-    for html_file in root_path.rglob('*.html'):
-        file_count += 1
-        print(f"Processing: {html_file}")
-        
-        sections = parse_html_file(html_file)
-        total_sections += len(sections)
-        
-        for section in sections:
-            # Skip sections with 'footer' class
-            if 'footer' in section['classes']:
-                continue
-            # Group by classes only (no ID)
-            classes_str = ' '.join(sorted(section['classes']))
-            structure_key = f"classes:{classes_str}"
+    try:
+        if html_files is None:
+            html_files = source.items() if source is not None else walk_html_files(root_directory)
+        html_files = stats.timed_iter('walk', html_files)
+        for html_file, result in iter_parsed_files(html_files, jobs, cache, parser, hash_length, prescan, stats,
+                                                   source, analyzers, stream_threshold, dedup, lookahead):
+            aggregate_started = time.perf_counter()
+            file_count += 1
+            stats.add_file(html_file, result)
+            if verbose:
+                print(f"Processing: {html_file}")
+            else:
+                progress.update()
             
-            sections_by_structure[structure_key].append(section)
-    
-    # Now process each group to find unique children across all instances
-    unique_sections = {}
+            if result['skipped']:
+                skipped_count += 1
+            if result['duplicate']:
+                duplicate_count += 1
+            if result['error']:
+                failed_files.append(result['error'])
+            sections = result['sections']
+            total_sections += len(sections)
+            catalog.add_file(html_file, sections)
+            for name, other_catalog in (catalogs or {}).items():
+                other_catalog.add_file(html_file, result[name])
+            stats.stages['aggregate'] += time.perf_counter() - aggregate_started
+    finally:
+        if progress:
+            progress.close()
+        if owned_source:
+            owned_source.close()
+        if cache:
+            with stats.stage('cache'):
+                cache.close()
     
-    for structure_key, sections_list in sections_by_structure.items():
-        # Track which files contain each unique child
-        children_to_files = defaultdict(set)
-        all_files = []
-        first_section = sections_list[0]
-        
-        for section in sections_list:
-            file_name = Path(section['file']).name
-            
-            # Map each unique child to the files that contain it
-            for child in section['content_analysis']['unique_children']:
-                children_to_files[child].add(file_name)
-            
-            all_files.append({
-                'file': section['file'],
-                'all_attributes': section['attributes']
-            })
-        
-        # Create the final entry with file mapping
-        unique_sections[structure_key] = {
-            'classes': first_section['classes'],
-            'tag': first_section['tag'],  # Include tag info
-            'unique_children': sorted(list(children_to_files.keys())),
-            'children_to_files': {child: sorted(list(files)) for child, files in children_to_files.items()},
-            'first_seen_in': first_section['file'],
-            'occurrences': all_files
-        }
+    with stats.stage('aggregate'):
+        unique_sections = catalog.entries()
     
     print(f"\nProcessed {file_count} HTML files")
-    print(f"Found {total_sections} total sections")
-    print(f"Found {len(unique_sections)} unique section structures")
+    if duplicate_count:
+        print(f"Reused the results of {duplicate_count} files with the same contents as an earlier file")
+    if skipped_count:
+        print(f"Skipped {skipped_count} files with no {' or '.join(analyzers)} (byte pre-scan)")
+    if failed_files:
+        print(f"Could not catalog {len(failed_files)} files:")
+        for error in failed_files[:10]:
+            print(f"  - {error['file']} ({error['stage']}): {error['error']}")
+        if len(failed_files) > 10:
+            print(f"  ... and {len(failed_files) - 10} more")
+    if errors is not None:
+        errors.extend(failed_files)
+    if cache:
+        print(f"Loaded {cache.hits} files from cache, parsed {stats.parsed_files}")
+    if 'sections' in analyzers:
+        print(f"Found {total_sections} total sections")
+        print(f"Found {len(unique_sections)} unique section structures")
     
     return unique_sections
 
-def display_results(unique_sections, show_details=False, show_content=False, output_file=None):
-    """Display the cataloged sections in a readable format."""
-    output_lines = []
+def relative_display_path(file_path, root_directory=None):
+    """file_path relative to root_directory when it lies below it, else as given, with / separators."""
+    if root_directory:
+        root = os.path.abspath(root_directory)
+        absolute = os.path.abspath(file_path)
+        if absolute.startswith(os.path.join(root, '')):
+            return Path(os.path.relpath(absolute, root)).as_posix()
+    return Path(file_path).as_posix()
+
+def display_names(file_paths, root_directory=None):
+    """Map each of file_paths to the name a report lists it under.
+    
+    A file shows up by its file name unless another of the paths has the same one
+    (two folders' index.html), in which case it is shown relative to root_directory.
+    """
+    paths_by_name = defaultdict(set)
+    for file_path in file_paths:
+        paths_by_name[Path(file_path).name].add(file_path)
+    return {file_path: Path(file_path).name if len(paths_by_name[Path(file_path).name]) == 1
+            else relative_display_path(file_path, root_directory) for file_path in file_paths}
+
+def iter_report_lines(unique_sections, show_details=False, is_markdown=False, summary=None, root_directory=None):
+    """Yield the catalog report one line at a time.
     
-    output_lines.append("="*60)
-    output_lines.append("UNIQUE SECTION CATALOG")
-    output_lines.append("="*60)
+    If a `summary` dict from new_report_summary() is given, its statistics are tallied in
+    the same pass, ready for create_summary_section() once the last line has been yielded.
+    Files are listed by display_names() over each section's files, so a name is shown
+    relative to root_directory wherever it is ambiguous within the section.
+    """
+    if is_markdown:
+        yield "# 🏗️ Section Catalog"
+        yield ""
+        yield f"**Total unique sections:** {len(unique_sections)}"
+        yield ""
+    else:
+        yield "="*60
+        yield "UNIQUE SECTION CATALOG"
+        yield "="*60
     
     for i, (key, section_data) in enumerate(unique_sections.items(), 1):
         classes_display = ', '.join(section_data['classes']) if section_data['classes'] else 'None'
         
+        if summary is not None:
+            summary['total_sections'] += 1
+            if len(section_data['occurrences']) == 1:
+                summary['single_file_sections'] += 1
+            summary['tag_counts'][section_data['tag']] += 1
+            summary['class_counts'].update(section_data['classes'])
+        
         # Get the file name from the first occurrence
+        names = display_names([occurrence['file'] for occurrence in section_data['occurrences']], root_directory)
         first_file = section_data['first_seen_in']
-        file_name = Path(first_file).name
+        file_name = names.get(first_file, Path(first_file).name)
         
-        output_lines.append(f"\n{i}. Section Signature:")
-        output_lines.append(f"   Classes: {classes_display}")
-        output_lines.append(f"   Tag: {section_data['tag']}")
-        output_lines.append(f"   Found in {len(section_data['occurrences'])} file(s)")
+        if is_markdown:
+            yield f"## {i}. Section Signature"
+            yield ""
+            yield f"**Classes:** `{classes_display}`"
+            yield f"**Tag:** `{section_data['tag']}`"
+            yield f"**Found in:** {len(section_data['occurrences'])} file(s)"
+            if 'estimate' in section_data:
+                yield f"**Estimated for all files:** {format_estimate(section_data['estimate'])}"
+            yield ""
+        else:
+            yield f"\n{i}. Section Signature:"
+            yield f"   Classes: {classes_display}"
+            yield f"   Tag: {section_data['tag']}"
+            yield f"   Found in {len(section_data['occurrences'])} file(s)"
+            if 'estimate' in section_data:
+                yield f"   Estimated for all files: {format_estimate(section_data['estimate'])}"
         
         # Show all files if found in more than 1 file
         if len(section_data['occurrences']) > 1:
-            all_files = [Path(occ['file']).name for occ in section_data['occurrences']]
-            files_display = ', '.join(f'"{f}"' for f in all_files)
-            output_lines.append(f"   Files: {files_display}")
+            all_files = [names[occ['file']] for occ in section_data['occurrences']]
+            if is_markdown:
+                if len(all_files) <= 5:
+                    files_display = ', '.join(f'`{f}`' for f in all_files)
+                    yield f"**Files:** {files_display}"
+                else:
+                    files_display = ', '.join(f'`{f}`' for f in all_files[:3])
+                    yield f"**Files:** {files_display}... and {len(all_files) - 3} more"
+                    yield ""
+                    yield "<details>"
+                    yield "<summary>View all files</summary>"
+                    yield ""
+                    for file in all_files:
+                        yield f"- `{file}`"
+                    yield ""
+                    yield "</details>"
+                yield ""
+            else:
+                files_display = ', '.join(f'"{f}"' for f in all_files)
+                yield f"   Files: {files_display}"
         else:
-            first_file = section_data['first_seen_in']
-            file_name = Path(first_file).name
-            output_lines.append(f"   File: \"{file_name}\"")
+            if is_markdown:
+                yield f"**File:** `{file_name}`"
+                yield ""
+            else:
+                yield f"   File: \"{file_name}\""
         
         # Only show unique children if they appear in different files
         if section_data['unique_children'] and len(section_data['occurrences']) > 1:
             # Filter to only show children that don't appear in all files
-            all_files_set = set(Path(occ['file']).name for occ in section_data['occurrences'])
-            different_children = []
-            
-            for child in section_data['unique_children']:
-                files_with_child = set(section_data['children_to_files'][child])
-                # Only include if this child doesn't appear in all files
-                if files_with_child != all_files_set:
-                    different_children.append(child)
+            all_files_mask = section_data['file_mask']
+            children_to_files = section_data['children_to_files']
+            different_children = [child for child in section_data['unique_children']
+                                  if children_to_files[child] != all_files_mask]
             
             if different_children:
-                output_lines.append(f"   Unique Children (varying across files):")
+                if is_markdown:
+                    yield "### Unique Children (varying across files)"
+                    yield ""
+                else:
+                    yield f"   Unique Children (varying across files):"
+                
                 for child in different_children:
-                    files_with_child = section_data['children_to_files'][child]
-                    files_display = ', '.join(f'"{f}"' for f in files_with_child)
-                    output_lines.append(f"     - {child}")
-                    output_lines.append(f"       Found in: {files_display}")
+                    files_with_child = section_data['file_table'].names_for(children_to_files[child], names)
+                    if is_markdown:
+                        files_display = ', '.join(f'`{f}`' for f in files_with_child)
+                        yield f"**Element:** `{child}`"
+                        yield f"**Found in:** {files_display}"
+                        yield ""
+                    else:
+                        files_display = ', '.join(f'"{f}"' for f in files_with_child)
+                        yield f"     - {child}"
+                        yield f"       Found in: {files_display}"
             else:
-                output_lines.append(f"   Unique Children: All children consistent across files")
+                if is_markdown:
+                    yield "### Unique Children"
+                    yield ""
+                    yield "✅ All children consistent across files"
+                    yield ""
+                else:
+                    yield f"   Unique Children: All children consistent across files"
         elif section_data['unique_children'] and len(section_data['occurrences']) == 1:
             # For single files, don't show unique children unless specifically requested
-            output_lines.append(f"   Unique Children: {len(section_data['unique_children'])} elements (single file)")
+            if is_markdown:
+                yield "### Unique Children"
+                yield ""
+                yield f"📄 {len(section_data['unique_children'])} elements (single file)"
+                yield ""
+            else:
+                yield f"   Unique Children: {len(section_data['unique_children'])} elements (single file)"
         else:
-            output_lines.append(f"   Unique Children: None")
+            if is_markdown:
+                yield "### Unique Children"
+                yield ""
+                yield "❌ None"
+                yield ""
+            else:
+                yield f"   Unique Children: None"
         
         if show_details:
-            output_lines.append(f"   All section occurrences:")
+            if is_markdown:
+                yield "### All Section Occurrences"
+                yield ""
+            else:
+                yield f"   All section occurrences:"
+            
             for occurrence in section_data['occurrences']:
-                occurrence_file = Path(occurrence['file']).name
-                output_lines.append(f"     - {occurrence_file}")
-                if occurrence['all_attributes']:
-                    attrs = ', '.join([f"{k}='{v}'" for k, v in occurrence['all_attributes'].items()])
-                    output_lines.append(f"       Attributes: {attrs}")
+                occurrence_file = names[occurrence['file']]
+                if is_markdown:
+                    yield f"**File:** `{occurrence_file}`"
+                    if occurrence['all_attributes']:
+                        attrs = ', '.join([f"`{k}='{v}'`" for k, v in occurrence['all_attributes'].items()])
+                        yield f"**Attributes:** {attrs}"
+                    yield ""
+                else:
+                    yield f"     - {occurrence_file}"
+                    if occurrence['all_attributes']:
+                        attrs = ', '.join([f"{k}='{v}'" for k, v in occurrence['all_attributes'].items()])
+                        yield f"       Attributes: {attrs}"
+        
+        if is_markdown:
+            yield "---"
+            yield ""
+
+def format_estimate(estimate):
+    """One-line form of a --sample estimate, e.g. '~1200 occurrences (1100-1300) in ~400 files (380-420), 95% CI'."""
+    occurrences = estimate['occurrences']
+    files = estimate['files']
+    return (f"~{occurrences['estimate']} occurrences ({occurrences['low']}-{occurrences['high']}) "
+            f"in ~{files['estimate']} of {estimate['total_files']} files ({files['low']}-{files['high']}), 95% CI")
+
+def new_report_summary():
+    """Empty statistics for iter_report_lines() to fill in."""
+    return {
+        'total_sections': 0,
+        'single_file_sections': 0,
+        'tag_counts': Counter(),
+        'class_counts': Counter()
+    }
+
+def create_summary_section(summary, is_markdown=False):
+    """Create a summary section for the catalog from statistics gathered while rendering."""
+    output_lines = []
+    
+    total_sections = summary['total_sections']
+    single_file_sections = summary['single_file_sections']
+    multi_file_sections = total_sections - single_file_sections
+    class_counts = summary['class_counts']
     
-    # Join all lines with newlines
-    output_text = '\n'.join(output_lines)
+    if is_markdown:
+        output_lines.append("## 📊 Summary")
+        output_lines.append("")
+        output_lines.append(f"- **Total unique sections:** {total_sections}")
+        output_lines.append(f"- **Single file sections:** {single_file_sections}")
+        output_lines.append(f"- **Multi-file sections:** {multi_file_sections}")
+        output_lines.append(f"- **`<section>` elements:** {summary['tag_counts']['section']}")
+        output_lines.append(f"- **`<div>` elements:** {summary['tag_counts']['div']}")
+        output_lines.append("")
+        
+        if class_counts:
+            output_lines.append("### Most Common Classes")
+            output_lines.append("")
+            for class_name, count in class_counts.most_common(10):
+                output_lines.append(f"- `{class_name}`: {count} sections")
+            output_lines.append("")
+    
+    return output_lines
+
+def display_results(unique_sections, show_details=False, show_content=False, output_file=None, quiet=False,
+                    root_directory=None):
+    """Display the cataloged sections in a readable format.
     
-    # Print to console
-    print(output_text)
+    The report is streamed: each line goes to the output file (and the console, unless
+    quiet) as soon as it is rendered. Markdown files (.md) get a summary at the top, which
+    is gathered during the same pass and put in front of the rendered body at the end.
+    """
+    is_markdown = bool(output_file and output_file.endswith('.md'))
+    summary = new_report_summary() if is_markdown else None
     
-    # Write to file if specified
+    body_file = None
+    body_path = None
     if output_file:
+        # Markdown bodies go to a scratch file first so the summary can be written above them
+        body_path = output_file + '.partial' if is_markdown else output_file
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(output_text)
-            print(f"\nOutput saved to: {output_file}")
+            body_file = open(body_path, 'w', encoding='utf-8')
         except Exception as e:
             print(f"\nError writing to file: {e}")
+    
+    separator = ''
+    for line in iter_report_lines(unique_sections, show_details, is_markdown, summary, root_directory):
+        if body_file:
+            body_file.write(separator + line)
+            separator = '\n'
+        if not quiet:
+            # Print to console
+            sys.stdout.write(line + '\n')
+    
+    if not body_file:
+        return
+    
+    try:
+        body_file.close()
+        if is_markdown:
+            summary_text = '\n'.join(create_summary_section(summary, is_markdown))
+            if not quiet:
+                print(summary_text)
+            with open(output_file, 'w', encoding='utf-8') as f, open(body_path, encoding='utf-8') as body:
+                f.write(summary_text)
+                shutil.copyfileobj(body, f)
+            os.remove(body_path)
+        print(f"\nOutput saved to: {output_file}")
+    except Exception as e:
+        print(f"\nError writing to file: {e}")
 
-def find_similar_sections(unique_sections):
-    """Find sections that have the same classes but different content."""
-    sections_by_structure = defaultdict(list)
+def iter_script_report_lines(unique_scripts, total_files, show_details=False, is_markdown=False, root_directory=None):
+    """Yield the scripts report one line at a time: totals first, then every unique script, most widespread first.
+    
+    Files are listed like in iter_report_lines(), relative to root_directory where names collide.
+    """
+    total_tags = sum(len(script_data['occurrences']) for script_data in unique_scripts.values())
+    external_scripts = sum(1 for script_data in unique_scripts.values() if script_data['kind'] == 'external')
+    global_scripts = sum(1 for script_data in unique_scripts.values() if script_data['file_count'] == total_files)
+    blocking_in_head = sum(1 for script_data in unique_scripts.values()
+                           if any(occurrence['loading'] == 'blocking' and occurrence['position'] == 'head'
+                                  for occurrence in script_data['occurrences']))
     
-    for key, section_data in unique_sections.items():
-        classes_str = ' '.join(sorted(section_data['classes']))
-        structure_key = f"classes:{classes_str}"
+    if is_markdown:
+        yield "# 📜 Script Catalog"
+        yield ""
+        yield "## 📊 Summary"
+        yield ""
+        yield f"- **Files scanned:** {total_files}"
+        yield f"- **`<script>` tags:** {total_tags}"
+        yield f"- **Unique external scripts:** {external_scripts}"
+        yield f"- **Unique inline scripts:** {len(unique_scripts) - external_scripts}"
+        yield f"- **On every page:** {global_scripts}"
+        yield f"- **Render-blocking in `<head>`:** {blocking_in_head}"
+        yield ""
+    else:
+        yield "="*60
+        yield "UNIQUE SCRIPT CATALOG"
+        yield "="*60
+        yield f"Files scanned: {total_files}, <script> tags: {total_tags}, unique external: {external_scripts}, " \
+              f"unique inline: {len(unique_scripts) - external_scripts}"
+        yield f"On every page: {global_scripts}, render-blocking in <head>: {blocking_in_head}"
+    
+    for i, (key, script_data) in enumerate(unique_scripts.items(), 1):
+        title = 'External Script' if script_data['kind'] == 'external' else 'Inline Script'
+        loading = ', '.join(f"{mode} ({count})" for mode, count in script_data['loading'].items())
+        positions = ', '.join(f"{position} ({count})" for position, count in script_data['positions'].items())
+        types = ', '.join(f"{script_type} ({count})" for script_type, count in script_data['types'].items() if script_type)
+        on_every_page = script_data['file_count'] == total_files
+        found_in = f"{script_data['file_count']} file(s)" + (" (every page)" if on_every_page else "")
         
-        sections_by_structure[structure_key].append({
-            'full_key': key,
-            'content_hash': section_data['content_hash'],
-            'data': section_data
-        })
+        if is_markdown:
+            yield f"## {i}. {title}"
+            yield ""
+            if script_data['src']:
+                yield f"**Src:** `{script_data['src']}`"
+            else:
+                preview = script_data['preview'].replace('`', "'")
+                yield f"**Digest:** `{script_data['digest']}` ({script_data['size']} characters)"
+                yield f"**Preview:** `{preview}`"
+            yield f"**Loading:** {loading}"
+            yield f"**Position:** {positions}"
+            if types:
+                yield f"**Type:** {types}"
+            yield f"**Found in:** {found_in}"
+            yield ""
+        else:
+            yield f"\n{i}. {title}:"
+            if script_data['src']:
+                yield f"   Src: {script_data['src']}"
+            else:
+                yield f"   Digest: {script_data['digest']} ({script_data['size']} characters)"
+                yield f"   Preview: {script_data['preview']}"
+            yield f"   Loading: {loading}"
+            yield f"   Position: {positions}"
+            if types:
+                yield f"   Type: {types}"
+            yield f"   Found in {found_in}"
+        
+        # Listing every page for site-wide scripts says nothing
+        names = display_names([occurrence['file'] for occurrence in script_data['occurrences']], root_directory)
+        all_files = list(dict.fromkeys(names[occurrence['file']] for occurrence in script_data['occurrences']))
+        if not on_every_page or len(all_files) == 1:
+            if is_markdown:
+                if len(all_files) <= 5:
+                    files_display = ', '.join(f'`{f}`' for f in all_files)
+                    yield f"**Files:** {files_display}"
+                else:
+                    files_display = ', '.join(f'`{f}`' for f in all_files[:3])
+                    yield f"**Files:** {files_display}... and {len(all_files) - 3} more"
+                    yield ""
+                    yield "<details>"
+                    yield "<summary>View all files</summary>"
+                    yield ""
+                    for file in all_files:
+                        yield f"- `{file}`"
+                    yield ""
+                    yield "</details>"
+                yield ""
+            else:
+                files_display = ', '.join(f'"{f}"' for f in all_files)
+                yield f"   Files: {files_display}"
+        
+        if show_details:
+            if is_markdown:
+                yield "### All Script Occurrences"
+                yield ""
+            else:
+                yield f"   All script occurrences:"
+            
+            for occurrence in script_data['occurrences']:
+                occurrence_file = names[occurrence['file']]
+                if is_markdown:
+                    yield f"**File:** `{occurrence_file}` ({occurrence['position']}, {occurrence['loading']})"
+                    if occurrence['all_attributes']:
+                        attrs = ', '.join([f"`{k}='{v}'`" for k, v in occurrence['all_attributes'].items()])
+                        yield f"**Attributes:** {attrs}"
+                    yield ""
+                else:
+                    yield f"     - {occurrence_file} ({occurrence['position']}, {occurrence['loading']})"
+                    if occurrence['all_attributes']:
+                        attrs = ', '.join([f"{k}='{v}'" for k, v in occurrence['all_attributes'].items()])
+                        yield f"       Attributes: {attrs}"
+        
+        if is_markdown:
+            yield "---"
+            yield ""
+
+def display_script_results(unique_scripts, total_files, show_details=False, output_file=None, quiet=False,
+                           root_directory=None):
+    """Write the scripts report to output_file (markdown for .md) and/or the console, streamed like display_results()."""
+    is_markdown = bool(output_file and output_file.endswith('.md'))
+    report_file = None
+    if output_file:
+        try:
+            report_file = open(output_file, 'w', encoding='utf-8')
+        except Exception as e:
+            print(f"\nError writing to file: {e}")
+    
+    separator = ''
+    for line in iter_script_report_lines(unique_scripts, total_files, show_details, is_markdown, root_directory):
+        if report_file:
+            report_file.write(separator + line)
+            separator = '\n'
+        if not quiet:
+            sys.stdout.write(line + '\n')
+    
+    if report_file:
+        report_file.close()
+        print(f"\nScripts report saved to: {output_file}")
+
+def section_shingles(signature_ids, shingle_size=SHINGLE_SIZE):
+    """64-bit hashes of the runs of `shingle_size` consecutive element keys in a section."""
+    records = SIGNATURES.records
+    keys = [records[signature_id].key_bytes for signature_id in signature_ids]
+    if not keys:
+        return set()
+    
+    # Sections shorter than a shingle become a single shingle of everything they contain
+    runs = range(max(1, len(keys) - shingle_size + 1))
+    return {
+        int.from_bytes(hashlib.blake2b(b'\x1f'.join(keys[i:i + shingle_size]), digest_size=8).digest(), 'little')
+        for i in runs
+    }
+
+def minhash_permutations(num_perm=DEFAULT_MINHASH_PERMUTATIONS):
+    """The (a, b) pairs of the hash functions (a * x + b) mod p, fixed so signatures are reproducible."""
+    rng = random.Random(num_perm)
+    return [(rng.randrange(1, MINHASH_PRIME), rng.randrange(0, MINHASH_PRIME)) for _ in range(num_perm)]
+
+def compute_minhash(shingles, permutations):
+    """MinHash signature of a non-empty shingle set."""
+    return tuple(min((a * shingle + b) % MINHASH_PRIME for shingle in shingles) for a, b in permutations)
+
+def minhash_similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures: the share of positions they agree on."""
+    return sum(x == y for x, y in zip(signature, other)) / len(signature)
+
+def lsh_band_layout(num_perm, threshold):
+    """(bands, rows) splitting num_perm so the LSH candidate threshold (1/bands)^(1/rows) is closest to `threshold`."""
+    layouts = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    return min(layouts, key=lambda layout: abs((1 / layout[0]) ** (1 / layout[1]) - threshold))
+
+def find_similar_sections(unique_sections, threshold=DEFAULT_SIMILARITY_THRESHOLD,
+                          num_perm=DEFAULT_MINHASH_PERMUTATIONS):
+    """Find section variants: same classes with different content, and near-identical content across classes.
+    
+    Returns a dict with 'variants_by_structure' (structure key -> its content variants, for
+    structures with more than one) and 'clusters' (lists of variants whose estimated Jaccard
+    similarity of element-key shingles is at least `threshold`, linked transitively). Every
+    distinct variant is MinHashed once and bucketed with LSH, so clustering stays roughly
+    linear in the number of variants instead of comparing every pair.
+    """
+    variants = []
+    variants_by_structure = {}
+    for structure_key, section_data in unique_sections.items():
+        structure_variants = []
+        for variant in section_data['variants']:
+            content = variant['content_analysis']
+            structure_variants.append({
+                'structure_key': structure_key,
+                'classes': section_data['classes'],
+                'content_hash': variant['content_hash'],
+                'occurrences': variant['occurrences'],
+                'first_seen_in': variant['first_seen_in'],
+                'total_elements': content['total_elements'],
+                'unique_elements': content['unique_elements'],
+                'signature_ids': content['element_signatures']
+            })
+        if len(structure_variants) > 1:
+            variants_by_structure[structure_key] = structure_variants
+        variants.extend(structure_variants)
+    
+    # MinHash each variant once; identical content hashes share a signature
+    permutations = minhash_permutations(num_perm)
+    minhashes = {}
+    signatures = []
+    for variant in variants:
+        shingles = section_shingles(variant['signature_ids'])
+        if not shingles:
+            # Empty sections have nothing to compare
+            signatures.append(None)
+            continue
+        if variant['content_hash'] not in minhashes:
+            minhashes[variant['content_hash']] = compute_minhash(shingles, permutations)
+        signatures.append(minhashes[variant['content_hash']])
+    
+    parents = list(range(len(variants)))
+    
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+    
+    # Variants with the same content share one MinHash and always match, so they are joined
+    # up front and only the first of them goes into the LSH buckets
+    representatives = {}
+    for index, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        representative = representatives.setdefault(id(signature), index)
+        if representative != index:
+            parents[index] = representative
     
-    similar_sections = {}
-    for structure_key, sections in sections_by_structure.items():
-        if len(sections) > 1:
-            similar_sections[structure_key] = sections
+    # Variants that agree on every row of some band share a bucket
+    bands, rows = lsh_band_layout(num_perm, threshold)
+    buckets = defaultdict(list)
+    for index in representatives.values():
+        signature = signatures[index]
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(index)
     
-    return similar_sections
+    # Walk each bucket comparing a variant only with one variant of every cluster already seen
+    # in it. A variant whose cluster is already there is skipped: everything seen after it was
+    # compared with that cluster. A bucket of near-identical variants costs one comparison each.
+    for members in buckets.values():
+        seen = []
+        for index in members:
+            if any(find(other) == find(index) for other in seen):
+                continue
+            matched = False
+            for other in seen:
+                if find(other) == find(index):
+                    continue
+                if minhash_similarity(signatures[index], signatures[other]) >= threshold:
+                    parents[find(other)] = find(index)
+                    matched = True
+            if not matched:
+                seen.append(index)
+    
+    clusters = defaultdict(list)
+    for index, variant in enumerate(variants):
+        if signatures[index] is not None:
+            clusters[find(index)].append(variant)
+    
+    return {
+        'variants_by_structure': variants_by_structure,
+        'clusters': [members for members in clusters.values() if len(members) > 1],
+        'threshold': threshold
+    }
 
 def display_similar_sections(similar_sections):
     """Display sections that look similar but have different content."""
-    if not similar_sections:
+    variants_by_structure = similar_sections['variants_by_structure']
+    if not variants_by_structure:
         print("\nNo sections found with same classes but different content.")
+    else:
+        print("\n" + "="*60)
+        print("SECTIONS WITH SAME STRUCTURE BUT DIFFERENT CONTENT")
+        print("="*60)
+        
+        for structure_key, variants in variants_by_structure.items():
+            print(f"\nStructure: {structure_key}")
+            print(f"Found {len(variants)} variants:")
+            
+            for i, variant in enumerate(variants, 1):
+                print(f"  {i}. Content Hash: {variant['content_hash']}")
+                print(f"     Occurrences: {variant['occurrences']}")
+                print(f"     First seen: {variant['first_seen_in']}")
+                
+                # Show what's different about the content
+                print(f"     Elements: {variant['total_elements']} total, {variant['unique_elements']} unique")
+    
+    clusters = similar_sections['clusters']
+    threshold = similar_sections['threshold']
+    if not clusters:
+        print(f"\nNo near-duplicate sections found (similarity >= {threshold:.2f}).")
         return
     
     print("\n" + "="*60)
-    print("SECTIONS WITH SAME STRUCTURE BUT DIFFERENT CONTENT")
+    print(f"NEAR-DUPLICATE SECTIONS (similarity >= {threshold:.2f})")
     print("="*60)
     
-    for structure_key, sections in similar_sections.items():
-        print(f"\nStructure: {structure_key}")
-        print(f"Found {len(sections)} variants:")
-        
-        for i, section in enumerate(sections, 1):
-            data = section['data']
-            print(f"  {i}. Content Hash: {section['content_hash']}")
-            print(f"     Files: {len(data['occurrences'])}")
-            print(f"     First seen: {data['first_seen_in']}")
-            
-            # Show what's different about the content
-            content = data['content_analysis']
-            print(f"     Elements: {content['total_elements']} total, {content['unique_elements']} unique")
-
-def save_to_json(unique_sections, output_file):
-    """Save the catalog to a JSON file."""
-    json_data = []
-    for key, section_data in unique_sections.items():
-        json_data.append({
-            'signature_key': key,
-            'classes': section_data['classes'],
-            'tag': section_data['tag'],
-            'content_hash': section_data['content_hash'],
-            'content_analysis': section_data['content_analysis'],
-            'occurrence_count': len(section_data['occurrences']),
-            'first_seen_in': section_data['first_seen_in'],
-            'occurrences': section_data['occurrences']
-        })
+    for i, members in enumerate(clusters, 1):
+        class_sets = len(set(member['structure_key'] for member in members))
+        occurrences = sum(member['occurrences'] for member in members)
+        print(f"\nCluster {i}: {len(members)} variants, {class_sets} class set(s), {occurrences} occurrences")
+        for member in members:
+            classes_display = ', '.join(member['classes']) if member['classes'] else 'None'
+            print(f"  - Classes: {classes_display}")
+            print(f"    Content Hash: {member['content_hash']}, {member['occurrences']} occurrences, "
+                  f"{member['total_elements']} elements, first seen: {member['first_seen_in']}")
+
+def describe_section_difference(reference, other):
+    """Explain the first way two parse results of the same document differ, or return None if they match."""
+    if len(reference) != len(other):
+        return f"{len(reference)} sections with {DEFAULT_PARSER}, {len(other)} with this parser"
+    
+    for i, (expected, actual) in enumerate(zip(reference, other), 1):
+        label = f"section {i} <{expected['tag']} class=\"{' '.join(expected['classes'])}\">"
+        if (expected['tag'], expected['classes']) != (actual['tag'], actual['classes']):
+            return f"{label} came back as <{actual['tag']} class=\"{' '.join(actual['classes'])}\">"
+        if expected['attributes'] != actual['attributes']:
+            return f"{label} has different attributes"
+        expected_signatures = expected['content_analysis']['element_signatures']
+        actual_signatures = actual['content_analysis']['element_signatures']
+        if expected_signatures != actual_signatures:
+            return (f"{label} has different element signatures "
+                    f"({len(expected_signatures)} vs {len(actual_signatures)} elements)")
+        if expected['content_hash'] != actual['content_hash']:
+            return f"{label} content hash {expected['content_hash']} vs {actual['content_hash']}"
+    
+    return None
+
+def check_parser_conformance(root_directory, parsers):
+    """Parse every HTML file with each backend and report the documents where it disagrees with html.parser.
+    
+    'stream' in `parsers` checks streaming mode (stream_html_file()) the same way.
+    """
+    html_files = sorted(walk_html_files(root_directory))
+    differences = {parser: [] for parser in parsers if parser != DEFAULT_PARSER}
+    
+    for html_file in html_files:
+        reference, reference_error = try_parse_html_file(html_file, DEFAULT_PARSER)
+        for parser in differences:
+            if parser == 'stream':
+                results, error = stream_html_file(html_file)
+                other = results.get('sections', [])
+            else:
+                other, error = try_parse_html_file(html_file, parser)
+            if reference_error or error:
+                if reference_error != error:
+                    failed = error or reference_error
+                    differences[parser].append((str(html_file), f"{failed['stage']} error: {failed['error']}"))
+                continue
+            difference = describe_section_difference(reference, other)
+            if difference:
+                differences[parser].append((str(html_file), difference))
+    
+    print("="*60)
+    print("PARSER CONFORMANCE")
+    print("="*60)
+    print(f"Reference parser: {DEFAULT_PARSER}, {len(html_files)} documents")
+    
+    for parser, differing in differences.items():
+        if not differing:
+            print(f"\n{parser}: all {len(html_files)} documents match")
+            continue
+        print(f"\n{parser}: {len(differing)} of {len(html_files)} documents differ")
+        for file_name, difference in differing:
+            print(f"  - {file_name}: {difference}")
+    
+    return differences
+
+def build_json_entry(key, section_data, include_signatures=True):
+    """One catalog entry in the JSON output shape."""
+    if include_signatures:
+        content_analysis = expand_content_analysis(section_data['content_analysis'])
+    else:
+        content_analysis = {k: v for k, v in section_data['content_analysis'].items() if k != 'element_signatures'}
+    
+    entry = {
+        'signature_key': key,
+        'classes': section_data['classes'],
+        'tag': section_data['tag'],
+        'content_hash': section_data['content_hash'],
+        'content_analysis': content_analysis,
+        'occurrence_count': len(section_data['occurrences']),
+        'first_seen_in': section_data['first_seen_in'],
+        'occurrences': section_data['occurrences']
+    }
+    if 'estimate' in section_data:
+        entry['estimate'] = section_data['estimate']
+    return entry
+
+def json_format_for(output_file):
+    """Default JSON output format for a file name: NDJSON for .ndjson/.jsonl, a JSON array otherwise."""
+    return 'ndjson' if output_file.endswith(('.ndjson', '.jsonl')) else 'json'
+
+def save_to_json(unique_sections, output_file, json_format='json', include_signatures=True):
+    """Save the catalog to a JSON file.
     
+    Entries are serialized and written one at a time, so the whole document never sits in
+    memory. 'json' writes the same indented array json.dump() would; 'ndjson' writes one
+    entry per line.
+    """
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, indent=2, ensure_ascii=False)
+        if json_format == 'ndjson':
+            for key, section_data in unique_sections.items():
+                entry = build_json_entry(key, section_data, include_signatures)
+                f.write(json.dumps(entry, ensure_ascii=False))
+                f.write('\n')
+        else:
+            separator = '[\n'
+            for key, section_data in unique_sections.items():
+                entry = build_json_entry(key, section_data, include_signatures)
+                # Nest the entry one level deep, matching json.dump(entries, indent=2)
+                f.write(separator)
+                f.write('\n'.join('  ' + line for line in json.dumps(entry, indent=2, ensure_ascii=False).split('\n')))
+                separator = ',\n'
+            f.write('[]' if separator == '[\n' else '\n]')
     
     print(f"\nResults saved to: {output_file}")
 
-def main():
-    parser = argparse.ArgumentParser(description='Catalog unique HTML sections by classes and content')
-    parser.add_argument('directory', help='Root directory to search for HTML files')
+def save_scripts_to_json(unique_scripts, output_file, json_format='json'):
+    """Save the script catalog to a JSON file, as an indented array or one script per line ('ndjson')."""
+    entries = ({'script_key': key, **script_data} for key, script_data in unique_scripts.items())
+    with open(output_file, 'w', encoding='utf-8') as f:
+        if json_format == 'ndjson':
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False))
+                f.write('\n')
+        else:
+            json.dump(list(entries), f, indent=2, ensure_ascii=False)
+    
+    print(f"\nScripts saved to: {output_file}")
+
+def write_script_outputs(script_catalog, outputs, show_details=False, quiet=True, walk_order=None, root_directory=None):
+    """Save the script catalog to each file in outputs: JSON for .json, .ndjson and .jsonl, the report otherwise.
+    
+    Unless quiet, the report is also echoed to the console (once).
+    """
+    unique_scripts = script_catalog.entries(walk_order)
+    total_files = script_catalog.file_count()
+    print(f"Found {sum(len(script_data['occurrences']) for script_data in unique_scripts.values())} script tags, "
+          f"{len(unique_scripts)} unique scripts")
+    
+    reports = []
+    for output_file in outputs:
+        if output_file.endswith(('.json', '.ndjson', '.jsonl')):
+            save_scripts_to_json(unique_scripts, output_file, json_format_for(output_file))
+        else:
+            reports.append(output_file)
+    for index, report in enumerate(reports or [None]):
+        display_script_results(unique_scripts, total_files, show_details, report, quiet or index > 0, root_directory)
+
+class BatchedInserts:
+    """Buffers rows per INSERT statement and writes them with executemany() in batches."""
+    
+    def __init__(self, connection, batch_rows=CATALOG_DB_BATCH_ROWS):
+        self.connection = connection
+        self.batch_rows = batch_rows
+        self.pending = defaultdict(list)
+    
+    def add(self, statement, row):
+        rows = self.pending[statement]
+        rows.append(row)
+        if len(rows) >= self.batch_rows:
+            self.connection.executemany(statement, rows)
+            rows.clear()
+    
+    def flush(self):
+        for statement, rows in self.pending.items():
+            if rows:
+                self.connection.executemany(statement, rows)
+                rows.clear()
+
+def save_to_sqlite(unique_sections, db_path):
+    """Save the catalog to a normalized SQLite database for the query subcommand.
+    
+    Tables: files, signatures (with their class tokens and key attributes), structures (with
+    class tokens and content variants), structure_files, occurrences and children, the
+    membership of each unique child element per structure and file. Everything is inserted in
+    one transaction into a temporary file that replaces db_path at the end.
+    """
+    partial_path = db_path + '.partial'
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    
+    connection = sqlite3.connect(partial_path)
+    # A half-written export is thrown away anyway, so skip journaling and fsyncs
+    connection.execute('PRAGMA journal_mode = OFF')
+    connection.execute('PRAGMA synchronous = OFF')
+    connection.executescript(CATALOG_DB_SCHEMA)
+    inserts = BatchedInserts(connection)
+    
+    # Children are stored in display form; map each back to its interned signature
+    signature_ids = {}
+    for signature_id, record in enumerate(SIGNATURES.records):
+        signature_ids.setdefault(record.display, signature_id)
+    written_signatures = set()
+    
+    def signature_for(display):
+        signature_id = signature_ids[display]
+        if signature_id not in written_signatures:
+            written_signatures.add(signature_id)
+            record = SIGNATURES.records[signature_id]
+            inserts.add('INSERT INTO signatures VALUES (?, ?, ?, ?, ?)',
+                        (signature_id, record.tag, ' '.join(record.classes), record.key, record.display))
+            for cls in dict.fromkeys(record.classes):
+                inserts.add('INSERT INTO signature_classes VALUES (?, ?)', (signature_id, cls))
+            for attr, value in record.key_attributes:
+                value = ' '.join(value) if isinstance(value, tuple) else value
+                inserts.add('INSERT INTO signature_attributes VALUES (?, ?, ?)', (signature_id, attr, value))
+        return signature_id
+    
+    file_table = None
+    all_files = 0
+    with connection:
+        connection.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('db_version', str(CATALOG_DB_VERSION)),
+            ('rules_version', str(CATALOG_RULES_VERSION)),
+            ('key_attributes', json.dumps(KEY_ATTRIBUTES))
+        ])
+        
+        for structure_id, (structure_key, section_data) in enumerate(unique_sections.items()):
+            file_table = section_data['file_table']
+            all_files |= section_data['file_mask']
+            content = section_data['content_analysis']
+            first_file_ids = file_table.ids
+            file_ids = list(file_table.iter_ids(section_data['file_mask']))
+            inserts.add('INSERT INTO structures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                structure_id, structure_key, section_data['tag'], ' '.join(section_data['classes']),
+                section_data['content_hash'], content['total_elements'], content['unique_elements'],
+                len(section_data['occurrences']), len(file_ids), first_file_ids[section_data['first_seen_in']]
+            ))
+            for cls in dict.fromkeys(section_data['classes']):
+                inserts.add('INSERT INTO structure_classes VALUES (?, ?)', (structure_id, cls))
+            for variant in section_data['variants']:
+                inserts.add('INSERT INTO variants VALUES (?, ?, ?, ?)', (
+                    structure_id, variant['content_hash'], variant['occurrences'],
+                    first_file_ids[variant['first_seen_in']]
+                ))
+            
+            occurrences_per_file = Counter()
+            for occurrence in section_data['occurrences']:
+                file_id = first_file_ids[occurrence['file']]
+                occurrences_per_file[file_id] += 1
+                inserts.add('INSERT INTO occurrences VALUES (?, ?, ?)',
+                            (structure_id, file_id, json.dumps(occurrence['all_attributes'], ensure_ascii=False)))
+            for file_id in file_ids:
+                inserts.add('INSERT INTO structure_files VALUES (?, ?, ?)',
+                            (structure_id, file_id, occurrences_per_file[file_id]))
+            
+            for child, mask in section_data['children_to_files'].items():
+                signature_id = signature_for(child)
+                for file_id in file_table.iter_ids(mask):
+                    inserts.add('INSERT INTO children VALUES (?, ?, ?)', (structure_id, signature_id, file_id))
+        
+        if file_table is not None:
+            for file_id in file_table.iter_ids(all_files):
+                file_path = file_table.paths[file_id]
+                inserts.add('INSERT INTO files VALUES (?, ?, ?)', (file_id, file_path, Path(file_path).name))
+        inserts.flush()
+    
+    connection.executescript(CATALOG_DB_INDEXES)
+    connection.execute('ANALYZE')
+    connection.close()
+    os.replace(partial_path, db_path)
+    
+    print(f"Database saved to: {db_path}")
+
+def parse_child_selector(selector):
+    """Split a child selector like 'img.hero[loading=lazy]' into (tag, classes, [(attr, value or None)])."""
+    match = CHILD_SELECTOR.fullmatch(selector.strip())
+    if not match:
+        raise ValueError(f"can't understand child selector '{selector}' (expected e.g. img.hero[loading=lazy])")
+    tag, classes, attributes = match.groups()
+    attribute_filters = []
+    for name, value in re.findall(r'\[([\w-]+)(?:=([^\]]*))?\]', attributes):
+        attribute_filters.append((name, value.strip('"\'') if value else None))
+    return (tag if tag not in ('', '*') else None), [cls for cls in classes.split('.') if cls], attribute_filters
+
+def query_catalog(connection, classes=None, children=None, content_hash=None, file_glob=None, tag=None):
+    """(structure_id, file_id, occurrences) rows of the catalog database that match every filter.
+    
+    classes: class tokens the section must all have. children: child selectors (see
+    parse_child_selector()) that must all match an element inside the section in that same
+    file. content_hash: prefix of the structure's or one of its variants' content hash.
+    file_glob: SQLite GLOB on the file path. tag: 'section' or 'div'.
+    """
+    conditions = []
+    parameters = []
+    for cls in classes or []:
+        conditions.append('sf.structure_id IN (SELECT structure_id FROM structure_classes WHERE class = ?)')
+        parameters.append(cls)
+    
+    for selector in children or []:
+        child_tag, child_classes, child_attributes = parse_child_selector(selector)
+        child_conditions = ['c.structure_id = sf.structure_id', 'c.file_id = sf.file_id']
+        if child_tag:
+            child_conditions.append('c.signature_id IN (SELECT id FROM signatures WHERE tag = ?)')
+            parameters.append(child_tag)
+        for cls in child_classes:
+            child_conditions.append('c.signature_id IN (SELECT signature_id FROM signature_classes WHERE class = ?)')
+            parameters.append(cls)
+        for name, value in child_attributes:
+            if value is None:
+                child_conditions.append('c.signature_id IN (SELECT signature_id FROM signature_attributes WHERE name = ?)')
+                parameters.append(name)
+            else:
+                child_conditions.append(
+                    'c.signature_id IN (SELECT signature_id FROM signature_attributes WHERE name = ? AND value = ?)')
+                parameters.extend([name, value])
+        conditions.append(f"EXISTS (SELECT 1 FROM children c WHERE {' AND '.join(child_conditions)})")
+    
+    if content_hash:
+        conditions.append('(st.content_hash LIKE ? OR sf.structure_id IN '
+                          '(SELECT structure_id FROM variants WHERE content_hash LIKE ?))')
+        parameters.extend([content_hash + '%', content_hash + '%'])
+    if file_glob:
+        conditions.append('(f.path GLOB ? OR f.name GLOB ?)')
+        parameters.extend([file_glob, file_glob])
+    if tag:
+        conditions.append('st.tag = ?')
+        parameters.append(tag)
+    
+    sql = ('SELECT sf.structure_id, sf.file_id, sf.occurrences FROM structure_files sf '
+           'JOIN structures st ON st.id = sf.structure_id JOIN files f ON f.id = sf.file_id')
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    return connection.execute(sql + ' ORDER BY sf.structure_id, sf.file_id', parameters).fetchall()
+
+def print_catalog_overview(connection):
+    """Counts and most common section classes in a catalog database."""
+    files, structures, occurrences = connection.execute(
+        'SELECT (SELECT COUNT(*) FROM files), (SELECT COUNT(*) FROM structures), (SELECT COUNT(*) FROM occurrences)'
+    ).fetchone()
+    print(f"Files with sections: {files}")
+    print(f"Unique section structures: {structures}")
+    print(f"Section occurrences: {occurrences}")
+    print("Most common section classes:")
+    for cls, count in connection.execute(
+        'SELECT class, COUNT(*) FROM structure_classes GROUP BY class ORDER BY COUNT(*) DESC, class LIMIT 10'
+    ):
+        print(f"  {cls}: {count} structure(s)")
+
+def query_main(argv):
+    """The query subcommand: answer questions from a --db catalog without re-parsing the site."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} query",
+        description='Query a catalog database written with --db',
+        epilog="Example: query catalog.db --class product-benefit-section --child 'img[loading=lazy]' --files")
+    parser.add_argument('database', help='Catalog database file')
+    parser.add_argument('--class', dest='classes', action='append', metavar='CLASS',
+                       help='Sections that have this class, repeatable (all must match)')
+    parser.add_argument('--child', action='append', metavar='SELECTOR',
+                       help="Sections containing an element like tag.class[attr=value], repeatable (e.g. 'img[loading=lazy]')")
+    parser.add_argument('--hash', help='Sections whose content hash (or a variant\'s) starts with this')
+    parser.add_argument('--file', help='Only files whose path or name matches this glob (e.g. "blog/*")')
+    parser.add_argument('--tag', choices=['section', 'div'], help='Only <section> tags or only section-like divs')
+    parser.add_argument('--files', action='store_true',
+                       help='List the matching files instead of the matching section structures')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    parser.add_argument('--overview', action='store_true', help='Show counts and the most common classes')
+    
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.database):
+        parser.error(f"database '{args.database}' does not exist")
+    
+    connection = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    try:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'db_version'").fetchone()
+    except sqlite3.DatabaseError:
+        row = None
+    if not row or row[0] != str(CATALOG_DB_VERSION):
+        parser.error(f"'{args.database}' is not a catalog database from this version (re-run with --db)")
+    
+    if args.overview:
+        print_catalog_overview(connection)
+        return
+    
+    started = time.perf_counter()
+    try:
+        rows = query_catalog(connection, args.classes, args.child, args.hash, args.file, args.tag)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.files:
+        file_ids = sorted(set(file_id for _, file_id, _ in rows))
+        paths = [connection.execute('SELECT path FROM files WHERE id = ?', (file_id,)).fetchone()[0]
+                 for file_id in file_ids]
+        if args.json:
+            print(json.dumps(paths, indent=2, ensure_ascii=False))
+        else:
+            for path in paths:
+                print(path)
+        label = 'file(s)'
+        count = len(paths)
+    else:
+        matches = {}
+        for structure_id, file_id, occurrences in rows:
+            match = matches.setdefault(structure_id, {'files': 0, 'occurrences': 0})
+            match['files'] += 1
+            match['occurrences'] += occurrences
+        results = []
+        for structure_id, match in matches.items():
+            structure_key, tag, classes, content_hash, first_seen = connection.execute(
+                'SELECT st.structure_key, st.tag, st.classes, st.content_hash, f.path FROM structures st '
+                'JOIN files f ON f.id = st.first_seen_file_id WHERE st.id = ?', (structure_id,)
+            ).fetchone()
+            results.append({'signature_key': structure_key, 'classes': classes.split(), 'tag': tag,
+                            'content_hash': content_hash, 'files': match['files'],
+                            'occurrences': match['occurrences'], 'first_seen_in': first_seen})
+        if args.json:
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            for result in results:
+                classes_display = ', '.join(result['classes']) if result['classes'] else 'None'
+                print(f"{classes_display} <{result['tag']}> {result['content_hash']}: "
+                      f"{result['files']} file(s), {result['occurrences']} occurrence(s), "
+                      f"first seen in {result['first_seen_in']}")
+        label = 'section structure(s)'
+        count = len(results)
+    
+    connection.close()
+    if not args.json:
+        print(f"\n{count} {label} in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+def relative_file_path(file_path, root_directory):
+    """A walked path relative to the root, with forward slashes, as used in file lists and shard hashing."""
+    root = str(Path(root_directory))
+    relative = file_path if root == '.' else os.path.relpath(file_path, root)
+    return relative.replace(os.sep, '/')
+
+def read_file_list(list_file, root_directory):
+    """Paths from a --files-from list, spelled the way walk_html_files() would spell them."""
+    root = str(Path(root_directory))
+    prefix = '' if root == '.' else os.path.join(root, '')
+    html_files = []
+    with open(list_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            line = line.replace('\\', '/').removeprefix('./')
+            html_files.append(prefix + line.replace('/', os.sep))
+    return html_files
+
+def write_file_list(html_files, list_file, root_directory):
+    """Write paths relative to the root, one per line, and return how many."""
+    count = 0
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for html_file in html_files:
+            f.write(relative_file_path(html_file, root_directory) + '\n')
+            count += 1
+    return count
+
+def parse_shard(value):
+    """(K, N) from a 'K/N' shard spec, with 1 <= K <= N."""
+    try:
+        shard, shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"--shard must look like K/N, e.g. 2/8 (got '{value}')")
+    if not 1 <= shard <= shards:
+        raise ValueError(f"--shard {value}: K must be between 1 and N")
+    return shard, shards
+
+def shard_of(relative_path, shards):
+    """The shard (1 to shards) a file belongs to, from a stable hash of its relative path."""
+    digest = hashlib.blake2b(relative_path.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shards + 1
+
+def sample_stratum(relative_path):
+    """Stratum of a file for --sample: its first folders and the pattern of its name, with digits masked.
+    
+    blog/2021/03/hello.html and blog/2022/01/bye.html both fall in 'blog/#/*.html', while
+    blog/page-2.html and blog/page-14.html share 'blog/page-#.html'.
+    """
+    parts = relative_path.split('/')
+    folders = [DIGIT_RUN.sub('#', folder) for folder in parts[:-1][:SAMPLE_STRATUM_DEPTH]]
+    name = parts[-1]
+    pattern = DIGIT_RUN.sub('#', name) if DIGIT_RUN.search(name) else '*' + Path(name).suffix
+    return '/'.join(folders + [pattern])
+
+class SaturationSampler:
+    """Stratified random order of files for --sample, which runs out once new structures stop turning up.
+    
+    Files are grouped by sample_stratum(), shuffled within each stratum and handed out
+    round-robin across strata, so every kind of page is seen early and big strata can't
+    crowd out small ones. Passed to catalog_sections() as the 'sections' catalog, it sees
+    every cataloged file's sections and counts discoveries: new structure keys and new
+    content hashes of known ones. Once every stratum has been sampled and the last `window`
+    files brought fewer than stop_rate discoveries per file, iteration stops.
+    """
+    
+    def __init__(self, html_files, root_directory, window=DEFAULT_SAMPLE_WINDOW, stop_rate=DEFAULT_SAMPLE_STOP_RATE,
+                 seed=DEFAULT_SAMPLE_SEED):
+        rng = random.Random(seed)
+        strata = defaultdict(list)
+        for html_file in html_files:
+            strata[sample_stratum(relative_file_path(html_file, root_directory))].append(html_file)
+        for files in strata.values():
+            rng.shuffle(files)
+        self.strata = dict(sorted(strata.items()))
+        self.stratum_of = {str(html_file): stratum for stratum, files in self.strata.items() for html_file in files}
+        self.total_files = len(self.stratum_of)
+        self.window = window
+        self.stop_rate = stop_rate
+        
+        self.sampled = Counter()
+        self.files_done = 0
+        self.seen = set()
+        self.discoveries = 0
+        # (files cataloged, discoveries) each time a file was handed out, for the rate over the last window
+        self.history = deque()
+        # Structure key -> stratum -> [files containing it, occurrences, sum of squared occurrences per file]
+        self.tallies = defaultdict(dict)
+        self.stop_reason = None
+    
+    def __iter__(self):
+        queues = [iter(files) for files in self.strata.values()]
+        while queues:
+            remaining = []
+            for queue in queues:
+                html_file = next(queue, None)
+                if html_file is None:
+                    continue
+                if self.is_saturated():
+                    return
+                yield html_file
+                remaining.append(queue)
+            queues = remaining
+    
+    def is_saturated(self):
+        """Whether the discovery rate over the last `window` cataloged files has dropped below stop_rate."""
+        self.history.append((self.files_done, self.discoveries))
+        while len(self.history) > 1 and self.history[1][0] <= self.files_done - self.window:
+            self.history.popleft()
+        # Never stop before every stratum has had a file cataloged, or its counts couldn't be estimated
+        if len(self.sampled) < len(self.strata):
+            return False
+        files_then, discoveries_then = self.history[0]
+        if self.files_done - files_then < self.window:
+            return False
+        rate = (self.discoveries - discoveries_then) / (self.files_done - files_then)
+        if rate >= self.stop_rate:
+            return False
+        self.stop_reason = f"{rate * 100:.2g} new structures or variants per 100 files over the last {self.files_done - files_then}"
+        return True
+    
+    def add_file(self, file_path, sections):
+        """Count one cataloged file's sections (footers excluded, like SectionCatalog)."""
+        stratum = self.stratum_of[str(file_path)]
+        self.sampled[stratum] += 1
+        self.files_done += 1
+        counts = Counter()
+        for section in sections:
+            if 'footer' in section['classes']:
+                continue
+            structure_key = get_structure_key(section)
+            counts[structure_key] += 1
+            for discovery in (structure_key, (structure_key, section['content_hash'])):
+                if discovery not in self.seen:
+                    self.seen.add(discovery)
+                    self.discoveries += 1
+        for structure_key, count in counts.items():
+            tally = self.tallies[structure_key].get(stratum)
+            if tally is None:
+                tally = self.tallies[structure_key][stratum] = [0, 0, 0]
+            tally[0] += 1
+            tally[1] += count
+            tally[2] += count * count
+    
+    def estimate(self, by_stratum, value_index, square_index, single_weight):
+        """Stratified estimate of a site-wide total, with its 95% confidence interval.
+        
+        Each stratum's sample mean is scaled up to the stratum's size; the variance uses the
+        finite population correction, so strata that were cataloged in full add no
+        uncertainty. Strata with a single sampled file borrow the variance of the whole sample.
+        """
+        total = 0.0
+        variance = 0.0
+        value_sum = 0
+        square_sum = 0
+        for stratum, tally in by_stratum.items():
+            sampled = self.sampled[stratum]
+            size = len(self.strata[stratum])
+            total += size * tally[value_index] / sampled
+            value_sum += tally[value_index]
+            square_sum += tally[square_index]
+            if sampled > 1:
+                stratum_variance = (tally[square_index] - tally[value_index] ** 2 / sampled) / (sampled - 1)
+                variance += size * size * (1 - sampled / size) * stratum_variance / sampled
+        if self.files_done > 1:
+            pooled_variance = (square_sum - value_sum ** 2 / self.files_done) / (self.files_done - 1)
+            variance += pooled_variance * single_weight
+        
+        margin = CONFIDENCE_Z * math.sqrt(max(variance, 0.0))
+        # What was actually seen is a hard lower bound
+        return {
+            'estimate': round(total),
+            'low': max(value_sum, math.floor(total - margin)),
+            'high': math.ceil(total + margin)
+        }
+    
+    def annotate(self, unique_sections):
+        """Add site-wide estimates of its file and occurrence counts to every catalog entry, under 'estimate'."""
+        # Strata with one sampled file have no variance of their own (see estimate())
+        single_weight = sum(len(files) * (len(files) - 1) for stratum, files in self.strata.items()
+                            if self.sampled[stratum] == 1)
+        for structure_key, section_data in unique_sections.items():
+            by_stratum = self.tallies[structure_key]
+            files = self.estimate(by_stratum, 0, 0, single_weight)
+            files['high'] = min(files['high'], self.total_files)
+            section_data['estimate'] = {
+                'files': files,
+                'occurrences': self.estimate(by_stratum, 1, 2, single_weight),
+                'sampled_files': self.files_done,
+                'total_files': self.total_files
+            }
+    
+    def print_summary(self):
+        share = self.files_done / self.total_files * 100 if self.total_files else 100
+        print(f"Sampled {self.files_done} of {self.total_files} files ({share:.1f}%) from {len(self.strata)} strata")
+        if self.stop_reason:
+            print(f"Stopped at {self.stop_reason}; counts in the report are estimates for all files")
+        else:
+            print("Every file was cataloged before the discovery rate dropped, so the counts are exact")
+
+def pack_catalog(catalog, ordinals, errors, stats, rules, selection):
+    """A self-describing partial catalog: the per-file state of every structure group, before rendering.
+    
+    ordinals maps each cataloged file to its position in the full walk (or --files-from list),
+    which is what lets merge_partials() put files from different shards back in single-run
+    order. Groups, files and variants are written in that order, so the same set of files
+    always packs to the same document, however it was split and merged.
+    """
+    file_table = catalog.file_table
+    walk_order = sorted(ordinals, key=ordinals.__getitem__)
+    file_indexes = {file_table.ids[str(html_file)]: index for index, html_file in enumerate(walk_order)}
+    ranks = dict(file_indexes)
+    
+    groups = []
+    analyses = []
+    for structure_key, group in sorted(catalog.groups.items(), key=lambda item: item[1].sort_key(ranks)):
+        files = []
+        for file_id in group.ordered_file_ids(ranks):
+            ordinal, classes, tag, content_hash = group.files[file_id]['first']
+            files.append([file_indexes[file_id], ordinal, classes, tag, content_hash,
+                          group.files[file_id]['occurrences']])
+        variants = []
+        for content_hash, variant in group.ordered_variants(ranks):
+            variants.append([content_hash, len(analyses),
+                             sorted([file_indexes[file_id], count, ordinal]
+                                    for file_id, (count, ordinal) in variant['files'].items())])
+            analyses.append({'content_analysis': variant['content_analysis']})
+        children = [[child, [file_indexes[file_id] for file_id in file_table.iter_ids(mask)]]
+                    for child, mask in sorted(group.children_to_files.items())]
+        groups.append([structure_key, {'files': files, 'variants': variants, 'children': children}])
+    
+    packed = pack_sections(analyses)
+    return {
+        'format': PARTIAL_FORMAT,
+        'version': PARTIAL_VERSION,
+        'rules': rules,
+        'selection': selection,
+        'files': [[ordinals[html_file], str(html_file)] for html_file in walk_order],
+        'stats': {'files': stats.files, 'skipped_files': stats.skipped_files, 'sections': stats.sections},
+        'errors': sorted(errors, key=lambda error: ordinals.get(error['file'], 0)),
+        'signatures': packed['signatures'],
+        'analyses': [section['content_analysis'] for section in packed['sections']],
+        'groups': groups
+    }
+
+def save_partial(partial, output_file):
+    """Write a partial catalog as JSON, gzip-compressed if the name ends in .gz."""
+    opener = gzip.open if output_file.endswith('.gz') else open
+    with opener(output_file, 'wt', encoding='utf-8') as f:
+        json.dump(partial, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Partial catalog saved to: {output_file}")
+
+def load_partial(input_file):
+    """Read a partial catalog written by save_partial(), checking it really is one."""
+    opener = gzip.open if input_file.endswith('.gz') else open
+    with opener(input_file, 'rt', encoding='utf-8') as f:
+        partial = json.load(f)
+    if not isinstance(partial, dict) or partial.get('format') != PARTIAL_FORMAT:
+        raise ValueError(f"{input_file} is not a partial catalog")
+    if partial.get('version') != PARTIAL_VERSION:
+        raise ValueError(f"{input_file} was written by a different version of this script")
+    return partial
+
+def merge_partials(partials):
+    """Combine partial catalogs into one SectionCatalog.
+    
+    Returns (catalog, ordinals, errors, totals). Each file may only appear in one partial,
+    and all partials must come from the same cataloging rules. The result depends only on
+    the files involved, not on how they were grouped, so merges can be done as a tree.
+    """
+    rules = {partial['rules'] for partial in partials}
+    if len(rules) > 1:
+        raise ValueError('partials were made with different parsers, hash lengths or rules and cannot be merged')
+    
+    # Register every file first, in walk order, so file IDs follow the single-run order
+    ordinals = {}
+    seen_ordinals = {}
+    for partial in partials:
+        for ordinal, html_file in partial['files']:
+            if html_file in ordinals:
+                raise ValueError(f"{html_file} appears in more than one partial")
+            if seen_ordinals.get(ordinal, html_file) != html_file:
+                raise ValueError(f"{html_file} and {seen_ordinals[ordinal]} have the same position; "
+                                 'were the shards made from the same walk or --files-from list?')
+            seen_ordinals[ordinal] = html_file
+            ordinals[html_file] = ordinal
+    catalog = SectionCatalog()
+    walk_order = sorted(ordinals, key=ordinals.__getitem__)
+    for html_file in walk_order:
+        catalog.file_table.add(html_file)
+    file_ids = catalog.file_table.ids
+    
+    errors = []
+    totals = Counter()
+    for partial in partials:
+        local_files = [file_ids[html_file] for _, html_file in partial['files']]
+        analyses = unpack_sections({'signatures': partial['signatures'],
+                                    'sections': [{'content_analysis': analysis} for analysis in partial['analyses']]})
+        errors.extend(partial['errors'])
+        totals.update(partial['stats'])
+        
+        for structure_key, state in partial['groups']:
+            group = catalog.groups.get(structure_key)
+            if group is None:
+                group = catalog.groups[structure_key] = StructureGroup(catalog.file_table)
+            for file_index, ordinal, classes, tag, content_hash, occurrences in state['files']:
+                file_id = local_files[file_index]
+                group.files[file_id] = {'first': (ordinal, classes, tag, content_hash), 'occurrences': occurrences}
+                group.file_mask |= 1 << file_id
+                catalog.file_groups.setdefault(file_id, []).append(structure_key)
+            for content_hash, analysis_index, file_counts in state['variants']:
+                variant = group.variants.get(content_hash)
+                if variant is None:
+                    variant = group.variants[content_hash] = {
+                        'content_analysis': analyses[analysis_index]['content_analysis'],
+                        'files': {}
+                    }
+                for file_index, count, ordinal in file_counts:
+                    variant['files'][local_files[file_index]] = [count, ordinal]
+            for child, file_indexes in state['children']:
+                mask = group.children_to_files.get(child, 0)
+                for file_index in file_indexes:
+                    mask |= 1 << local_files[file_index]
+                group.children_to_files[child] = mask
+    
+    errors.sort(key=lambda error: ordinals.get(error['file'], 0))
+    return catalog, ordinals, errors, totals
+
+def merge_main(argv):
+    """The merge subcommand: combine partial catalogs into the catalog a single run would have produced."""
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} merge",
+        description='Merge partial catalogs saved with --partial (e.g. from --shard runs on several machines)',
+        epilog='Example: merge shard-*.json.gz --text sections_report.md --output catalog.json')
+    parser.add_argument('partials', nargs='+', help='Partial catalog files')
+    parser.add_argument('--partial', metavar='FILE',
+                       help='Save the merged result as another partial, to merge again later')
+    add_output_arguments(parser)
+    
+    args = parser.parse_args(argv)
+    check_output_arguments(parser, args)
+    
+    try:
+        partials = [load_partial(input_file) for input_file in args.partials]
+        catalog, ordinals, errors, totals = merge_partials(partials)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    
+    print(f"Merged {len(partials)} partial catalogs")
+    print(f"Processed {totals['files']} HTML files")
+    if totals['skipped_files']:
+        print(f"Skipped {totals['skipped_files']} files with no sections (byte pre-scan)")
+    if errors:
+        print(f"Could not catalog {len(errors)} files")
+    print(f"Found {totals['sections']} total sections")
+    
+    walk_order = sorted(ordinals, key=ordinals.__getitem__)
+    unique_sections = catalog.entries(walk_order)
+    print(f"Found {len(unique_sections)} unique section structures")
+    
+    stats = RunStats()
+    if args.partial:
+        stats.files, stats.skipped_files, stats.sections = totals['files'], totals['skipped_files'], totals['sections']
+        save_partial(pack_catalog(catalog, ordinals, errors, stats, partials[0]['rules'], 'merged'), args.partial)
+    write_outputs(args, unique_sections, errors, stats)
+
+def snapshot_files(html_files):
+    """(size, mtime_ns) for each file, to tell which files changed between two polls."""
+    snapshot = {}
+    for html_file in html_files:
+        try:
+            stat = os.stat(html_file)
+        except OSError:
+            continue
+        snapshot[str(html_file)] = (stat.st_size, stat.st_mtime_ns)
+    return snapshot
+
+def watch_catalog(args, catalog, snapshot, errors_by_file, extensions=None, script_catalog=None):
+    """Poll the tree and keep `catalog` up to date until interrupted.
+    
+    Every args.watch_interval seconds the tree is walked and stat'ed; files that were added,
+    changed or deleted since the last poll have their old sections taken out of the catalog
+    and their new ones parsed and added, and the outputs are rewritten. The rest of the site
+    is never re-parsed, so an update costs about as much as the edit.
+    A `script_catalog` (for --scripts) is kept up to date from the same parses.
+    """
+    analyzers = DEFAULT_ANALYZERS + ('scripts',) if script_catalog is not None else DEFAULT_ANALYZERS
+    print(f"\nWatching {args.directory} for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(args.watch_interval)
+            html_files = list(walk_html_files(args.directory, extensions, args.include, args.exclude,
+                                              not args.no_default_excludes))
+            current = snapshot_files(html_files)
+            changed = [html_file for html_file, state in current.items() if snapshot.get(html_file) != state]
+            removed = [html_file for html_file in snapshot if html_file not in current]
+            snapshot = current
+            if not changed and not removed:
+                continue
+            
+            started = time.perf_counter()
+            stats = RunStats(args.slowest)
+            for html_file in changed + removed:
+                catalog.remove_file(html_file)
+                if script_catalog is not None:
+                    script_catalog.remove_file(html_file)
+                errors_by_file.pop(html_file, None)
+            for html_file, result in iter_parsed_files(changed, args.jobs, None, args.parser, args.hash_length,
+                                                       not args.no_prescan, stats, None, analyzers,
+                                                       stream_threshold_for(args)):
+                stats.add_file(html_file, result)
+                if result['error']:
+                    errors_by_file[html_file] = result['error']
+                catalog.add_file(html_file, result['sections'])
+                if script_catalog is not None:
+                    script_catalog.add_file(html_file, result['scripts'])
+            
+            # Keep errors in walk order, like a full run reports them
+            errors = [errors_by_file[html_file] for html_file in html_files if html_file in errors_by_file]
+            unique_sections = catalog.entries(html_files)
+            write_outputs(args, unique_sections, errors, stats, script_catalog, html_files)
+            print(f"\nUpdated {len(changed)} changed and {len(removed)} deleted files in "
+                  f"{(time.perf_counter() - started) * 1000:.0f}ms, "
+                  f"{len(unique_sections)} unique section structures")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+
+def add_output_arguments(parser):
+    """Report and export options, shared by a normal run and the merge subcommand."""
+    parser.add_argument('--errors', '-e',
+                       help='Save the files that could not be read, decoded or parsed to this JSON file')
     parser.add_argument('--output', '-o', help='Output JSON file path')
-    parser.add_argument('--text', '-t', help='Output text file path')
+    parser.add_argument('--db',
+                       help='Save the catalog to this SQLite database for the query subcommand')
+    parser.add_argument('--json-format', choices=['json', 'ndjson'],
+                       help='JSON output format (default: ndjson for .ndjson/.jsonl files, json otherwise)')
+    parser.add_argument('--no-signatures', action='store_true',
+                       help='Leave content_analysis.element_signatures out of the JSON output')
+    parser.add_argument('--text', '-t', help='Output text file path (use a .md extension for a markdown report)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                       help="Don't echo the report to the console (it is still written to --text)")
     parser.add_argument('--details', '-d', action='store_true', 
                        help='Show detailed information about each occurrence')
     parser.add_argument('--content', '-c', action='store_true',
                        help='Show content breakdown for each section')
     parser.add_argument('--similar', '-s', action='store_true',
                        help='Show sections with same structure but different content')
+    parser.add_argument('--similarity', type=float, default=DEFAULT_SIMILARITY_THRESHOLD,
+                       help=f'Estimated Jaccard similarity for --similar to cluster sections (default: {DEFAULT_SIMILARITY_THRESHOLD})')
+    parser.add_argument('--minhash-perms', type=int, default=DEFAULT_MINHASH_PERMUTATIONS,
+                       help=f'MinHash permutations for --similar; more is more accurate and slower (default: {DEFAULT_MINHASH_PERMUTATIONS})')
+
+def check_output_arguments(parser, args):
+    if not 0 < args.similarity <= 1:
+        parser.error('--similarity must be between 0 and 1')
+    if args.minhash_perms < 1:
+        parser.error('--minhash-perms must be a positive number')
+
+def add_walk_arguments(parser):
+    """Options for finding and parsing the files, shared with the script cataloger."""
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Number of worker processes for parsing (0 = one per CPU, default: 1)')
+    parser.add_argument('--parser', '-p', choices=PARSER_BACKENDS, default=DEFAULT_PARSER,
+                       help=f'HTML parser backend (default: {DEFAULT_PARSER}; lxml and selectolax are much faster)')
+    parser.add_argument('--hash-length', type=int, default=DEFAULT_HASH_LENGTH,
+                       help=f'Hex characters kept from each content hash (default: {DEFAULT_HASH_LENGTH}, max: 128)')
+    parser.add_argument('--ext', action='append', metavar='EXTENSION',
+                       help='File extension to catalog, repeatable (default: .html), e.g. --ext .html --ext .htm')
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                       help='Only catalog files matching this glob, repeatable (e.g. "blog/**", "*.en.html")')
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                       help=f'Skip files and directories matching this glob, repeatable; also read from {CATALOG_IGNORE_FILE}')
+    parser.add_argument('--no-default-excludes', action='store_true',
+                       help='Also descend into node_modules, .git, build caches and the like')
+    parser.add_argument('--no-prescan', action='store_true',
+                       help='Parse every file, even ones a quick byte scan shows have nothing to catalog')
+    parser.add_argument('--dedup', action='store_true',
+                       help='Hash every file before parsing and reuse the result of byte-identical contents '
+                            'instead of parsing them again')
+    parser.add_argument('--dedup-normalize', action='store_true',
+                       help='Like --dedup, but also treat files as copies when they only differ in whitespace, '
+                            'CSRF tokens, nonces or asset build hashes')
+    parser.add_argument('--stream-threshold', type=float, default=DEFAULT_STREAM_THRESHOLD_MB, metavar='MB',
+                       help=f'Stream files of at least this many MB through an event parser instead of building their tree '
+                            f'(default: {DEFAULT_STREAM_THRESHOLD_MB}, 0 = every file)')
+    parser.add_argument('--cache', action='store_true',
+                       help=f'Reuse results for unchanged files from a parse cache (default location: DIRECTORY/{DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-dir',
+                       help='Parse cache location (implies --cache)')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                       help='Print every file as it is processed instead of a progress line')
+
+def check_walk_arguments(parser, args):
+    if args.jobs < 0:
+        parser.error('--jobs must be 0 or a positive number')
+    if not 1 <= args.hash_length <= 128:
+        parser.error('--hash-length must be between 1 and 128')
+    if args.stream_threshold < 0:
+        parser.error('--stream-threshold must be 0 or a positive number')
+    if args.parser not in available_parsers():
+        parser.error(f"the {args.parser} parser is not installed (pip install {args.parser})")
+    if is_archive(args.directory) and args.directory.lower().endswith(ZSTD_SUFFIXES) and zstandard is None:
+        parser.error('reading .tar.zst archives needs zstandard (pip install zstandard)')
+
+def walk_extensions(args):
+    """The --ext values with a leading dot, or None for the default extensions."""
+    return [ext if ext.startswith('.') else '.' + ext for ext in args.ext] if args.ext else None
+
+def dedup_mode_for(args):
+    """DEDUP_NORMALIZED, DEDUP_EXACT or None for --dedup-normalize / --dedup."""
+    if args.dedup_normalize:
+        return DEDUP_NORMALIZED
+    return DEDUP_EXACT if args.dedup else None
+
+def stream_threshold_for(args):
+    """--stream-threshold in bytes."""
+    return int(args.stream_threshold * 1048576)
+
+def cache_dir_for(args):
+    """Parse cache directory asked for with --cache or --cache-dir, or None."""
+    if args.cache and not args.cache_dir:
+        return os.path.join(args.directory, DEFAULT_CACHE_DIR)
+    return args.cache_dir
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'query':
+        query_main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        merge_main(sys.argv[2:])
+        return
+    
+    parser = argparse.ArgumentParser(description='Catalog unique HTML sections by classes and content',
+                                     epilog="Subcommands: '%(prog)s query --help' to query a catalog saved with --db, "
+                                            "'%(prog)s merge --help' to combine partial catalogs")
+    parser.add_argument('directory', help='Root directory to search for HTML files, or a .zip / .tar / .tar.gz / .tar.zst archive of one')
+    add_output_arguments(parser)
+    parser.add_argument('--scripts', action='append', metavar='FILE',
+                       help='Also catalog <script> tags in the same pass and save them here: a report (.md for markdown) '
+                            'or JSON (.json, .ndjson), repeatable')
+    add_walk_arguments(parser)
+    parser.add_argument('--check-parsers', action='store_true',
+                       help='Compare the other parser backends and streaming against html.parser on every file and list documents that differ')
+    parser.add_argument('--sample', action='store_true',
+                       help='Catalog a stratified random sample of the files until new structures stop turning up, '
+                            'and estimate counts for the whole site')
+    parser.add_argument('--sample-window', type=int, default=DEFAULT_SAMPLE_WINDOW, metavar='FILES',
+                       help=f'Files over which --sample measures the discovery rate (default: {DEFAULT_SAMPLE_WINDOW})')
+    parser.add_argument('--sample-stop', type=float, default=DEFAULT_SAMPLE_STOP_RATE, metavar='RATE',
+                       help=f'New structures or content variants per file below which --sample stops (default: {DEFAULT_SAMPLE_STOP_RATE})')
+    parser.add_argument('--sample-seed', type=int, default=DEFAULT_SAMPLE_SEED,
+                       help=f'Random seed for the order --sample picks files in (default: {DEFAULT_SAMPLE_SEED})')
+    parser.add_argument('--files-from', metavar='LIST',
+                       help='Catalog the files in this list (one path per line, relative to DIRECTORY) in that order instead of walking')
+    parser.add_argument('--list-files', metavar='LIST',
+                       help='Write the files a run would catalog, in order, to this list and exit (a manifest for --files-from)')
+    parser.add_argument('--shard', metavar='K/N',
+                       help='Only catalog shard K of N (files split by a hash of their path); needs --partial')
+    parser.add_argument('--partial', metavar='FILE',
+                       help='Save a partial catalog to this file (.json or .json.gz) for the merge subcommand')
+    parser.add_argument('--watch', '-w', action='store_true',
+                       help='Keep running and update the outputs whenever HTML files change')
+    parser.add_argument('--watch-interval', type=float, default=DEFAULT_WATCH_INTERVAL,
+                       help=f'Seconds between checks for changed files in --watch mode (default: {DEFAULT_WATCH_INTERVAL})')
+    parser.add_argument('--stats-json',
+                       help='Save stage timings, a per-file latency histogram, the slowest files and throughput to this JSON file')
+    parser.add_argument('--slowest', type=int, default=DEFAULT_SLOWEST_FILES,
+                       help=f'How many of the slowest files --stats-json lists (default: {DEFAULT_SLOWEST_FILES})')
+    parser.add_argument('--profile',
+                       help='Profile the run and save it to this file (cProfile .prof, or pyinstrument for .html)')
     
     args = parser.parse_args()
     
+    check_walk_arguments(parser, args)
+    check_output_arguments(parser, args)
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if not args.partial:
+            parser.error('--shard needs --partial to save the shard\'s catalog')
+    if args.watch and (args.shard or args.partial):
+        parser.error('--watch cannot be combined with --shard or --partial')
+    if args.sample and (args.watch or args.partial or args.list_files):
+        parser.error('--sample cannot be combined with --watch, --partial or --list-files')
+    if args.sample_window < 1:
+        parser.error('--sample-window must be a positive number')
+    if not 0 <= args.sample_stop <= 1:
+        parser.error('--sample-stop must be between 0 and 1')
+    if args.scripts and args.partial:
+        parser.error('--scripts cannot be combined with --partial (partial catalogs only hold sections)')
+    if is_archive(args.directory):
+        unsupported = [flag for flag, value in [('--watch', args.watch), ('--shard', args.shard), ('--partial', args.partial),
+                                                ('--files-from', args.files_from), ('--list-files', args.list_files),
+                                                ('--check-parsers', args.check_parsers), ('--sample', args.sample)]
+                       if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} can only be used with a directory, not an archive")
+    if args.watch_interval <= 0:
+        parser.error('--watch-interval must be a positive number')
+    if args.slowest < 0:
+        parser.error('--slowest must be 0 or a positive number')
+    if args.profile and args.profile.endswith('.html') and PyinstrumentProfiler is None:
+        parser.error('HTML profiles need pyinstrument (pip install pyinstrument); use a .prof file for cProfile')
+    
+    if args.check_parsers:
+        parsers = [args.parser] if args.parser != DEFAULT_PARSER else available_parsers() + ['stream']
+        differences = check_parser_conformance(args.directory, parsers)
+        sys.exit(1 if any(differences.values()) else 0)
+    
+    stats = RunStats(args.slowest)
+    profiler = None
+    if args.profile and args.profile.endswith('.html'):
+        profiler = PyinstrumentProfiler()
+        profiler.start()
+    elif args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    try:
+        run_catalog(args, stats)
+    finally:
+        if profiler:
+            if args.profile.endswith('.html'):
+                profiler.stop()
+                with open(args.profile, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            else:
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+            print(f"Profile saved to: {args.profile}")
+    
+    if args.stats_json or args.profile:
+        stats.print_summary()
+    if args.stats_json:
+        with open(args.stats_json, 'w', encoding='utf-8') as f:
+            json.dump(stats.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"Stats saved to: {args.stats_json}")
+
+def run_catalog(args, stats):
+    """Catalog, report and export as asked for on the command line, timing each stage into stats."""
+    cache_dir = cache_dir_for(args)
+    # --scripts catalogs the scripts from the same parse as the sections
+    script_catalog = ScriptCatalog() if args.scripts else None
+    analyzers = DEFAULT_ANALYZERS + ('scripts',) if script_catalog is not None else DEFAULT_ANALYZERS
+    catalogs = {'scripts': script_catalog} if script_catalog is not None else None
+    
     # Catalog the sections
-    unique_sections = catalog_sections(args.directory)
+    extensions = walk_extensions(args)
+    if is_archive(args.directory):
+        source = open_archive_source(args.directory, extensions, args.include, args.exclude, not args.no_default_excludes)
+        errors = []
+        try:
+            unique_sections = catalog_sections(args.directory, args.jobs, cache_dir, args.parser, args.hash_length,
+                                               not args.no_prescan, errors, source.items(), stats, args.verbose,
+                                               source=source, analyzers=analyzers, catalogs=catalogs,
+                                               stream_threshold=stream_threshold_for(args), dedup=dedup_mode_for(args))
+        finally:
+            source.close()
+        write_outputs(args, unique_sections, errors, stats, script_catalog)
+        return
+    
+    if args.files_from:
+        html_files = read_file_list(args.files_from, args.directory)
+    else:
+        html_files = walk_html_files(args.directory, extensions, args.include, args.exclude, not args.no_default_excludes)
+    
+    if args.list_files:
+        count = write_file_list(html_files, args.list_files, args.directory)
+        print(f"Listed {count} files in: {args.list_files}")
+        return
+    
+    ordinals = None
+    if args.partial:
+        # Every file's position in the full walk (or list), so merged shards come out in single-run order
+        html_files = list(html_files)
+        ordinals = {html_file: ordinal for ordinal, html_file in enumerate(html_files)}
+        if args.files_from:
+            missing = [html_file for html_file in html_files if not os.path.isfile(html_file)]
+            html_files = [html_file for html_file in html_files if os.path.isfile(html_file)]
+            if missing and not args.shard:
+                print(f"{len(missing)} listed files were not found under {args.directory}")
+        if args.shard:
+            shard, shards = args.shard
+            html_files = [html_file for html_file in html_files
+                          if shard_of(relative_file_path(html_file, args.directory), shards) == shard]
+    
+    sampler = None
+    if args.sample:
+        # The sampler hands out the files and watches their sections to know when to stop
+        sampler = SaturationSampler(html_files, args.directory, args.sample_window, args.sample_stop, args.sample_seed)
+        html_files = sampler
+        catalogs = dict(catalogs or {}, sections=sampler)
+    
+    errors = []
+    catalog = SectionCatalog()
+    if args.watch:
+        # Snapshot before parsing, so edits made during the first run are picked up by the first poll
+        html_files = list(html_files)
+        snapshot = snapshot_files(html_files)
+    unique_sections = catalog_sections(args.directory, args.jobs, cache_dir, args.parser, args.hash_length,
+                                       not args.no_prescan, errors, html_files, stats, args.verbose, catalog,
+                                       analyzers=analyzers, catalogs=catalogs, stream_threshold=stream_threshold_for(args),
+                                       dedup=dedup_mode_for(args), lookahead=SAMPLE_LOOKAHEAD if sampler else None)
+    if sampler:
+        sampler.print_summary()
+        sampler.annotate(unique_sections)
+    
+    if args.partial:
+        partial = pack_catalog(catalog, {html_file: ordinals[html_file] for html_file in html_files}, errors, stats,
+                               rules_fingerprint(args.parser, args.hash_length, stream_threshold_for(args)),
+                               f"shard {args.shard[0]}/{args.shard[1]}" if args.shard else 'all')
+        save_partial(partial, args.partial)
+    
+    write_outputs(args, unique_sections, errors, stats, script_catalog)
+    if args.watch:
+        watch_catalog(args, catalog, snapshot, {error['file']: error for error in errors}, extensions, script_catalog)
+
+def write_outputs(args, unique_sections, errors, stats, script_catalog=None, walk_order=None):
+    """Write the errors file, the report, the similar sections and the JSON output asked for on the command line.
+    
+    With a script_catalog, the --scripts files are written too (in walk_order, see ScriptCatalog.entries()).
+    """
+    if args.errors:
+        with open(args.errors, 'w', encoding='utf-8') as f:
+            json.dump(errors, f, indent=2, ensure_ascii=False)
+        print(f"Errors saved to: {args.errors}")
+    
+    if script_catalog is not None:
+        with stats.stage('render'):
+            write_script_outputs(script_catalog, args.scripts, args.details, args.quiet, walk_order, args.directory)
     
     if not unique_sections:
         print("No sections found!")
         return
     
     # Display results
-    display_results(unique_sections, args.details, args.content, args.text)
+    with stats.stage('render'):
+        display_results(unique_sections, args.details, args.content, args.text, args.quiet, args.directory)
     
     # Show similar sections if requested
     if args.similar:
-        similar_sections = find_similar_sections(unique_sections)
-        display_similar_sections(similar_sections)
+        with stats.stage('similar'):
+            similar_sections = find_similar_sections(unique_sections, args.similarity, args.minhash_perms)
+            display_similar_sections(similar_sections)
     
     # Save to JSON if requested
     if args.output:
-        save_to_json(unique_sections, args.output)
+        with stats.stage('json'):
+            json_format = args.json_format or json_format_for(args.output)
+            save_to_json(unique_sections, args.output, json_format, not args.no_signatures)
+    
+    if args.db:
+        with stats.stage('db'):
+            save_to_sqlite(unique_sections, args.db)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
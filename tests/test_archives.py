@@ -0,0 +1,66 @@
+"""
+Archive Cataloging Tests
+Zip and tar archives must catalog the same with worker processes as without.
+"""
+
+import io
+import sys
+import random
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONVERTER_DIR = REPO_ROOT / 'public' / 'converter'
+if str(CONVERTER_DIR) not in sys.path:
+    sys.path.insert(0, str(CONVERTER_DIR))
+
+import html_section_cataloger_deluxe as cataloger
+
+PAGES = 200
+
+def page(rng, index):
+    """A page of a few random sections, big enough that parallel reads of a shared handle would interleave."""
+    sections = []
+    for _ in range(rng.randint(2, 6)):
+        cards = ''.join(f'<div class="card card-{rng.randint(0, 9)}"><p>{rng.random()}</p></div>'
+                        for _ in range(rng.randint(1, 20)))
+        sections.append(f'<section class="block-{rng.randint(0, 20)}">{cards}</section>')
+    return f'<!DOCTYPE html>\n<html><head><title>Page {index}</title></head><body>{"".join(sections)}</body></html>\n'
+
+@pytest.fixture(scope='module')
+def pages():
+    rng = random.Random(1)
+    return {f"site/d{index % 7}/page-{index}.html": page(rng, index).encode() for index in range(PAGES)}
+
+def write_archive(archive_path, pages):
+    if archive_path.suffix == '.zip':
+        with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, data in pages.items():
+                archive.writestr(name, data)
+    else:
+        with tarfile.open(archive_path, 'w:gz') as archive:
+            for name, data in pages.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+
+def catalog_archive(archive_path, jobs):
+    """(file, error, sections) for every member, cataloged with `jobs` worker processes."""
+    source = cataloger.open_archive_source(archive_path)
+    try:
+        return [(file_name, result['error'], result['sections'])
+                for file_name, result in cataloger.iter_parsed_files(source.items(), jobs=jobs, source=source)]
+    finally:
+        source.close()
+
+@pytest.mark.parametrize('suffix', ['.zip', '.tar.gz'])
+def test_parallel_archive_matches_serial(tmp_path, pages, suffix):
+    archive_path = tmp_path / f"site{suffix}"
+    write_archive(archive_path, pages)
+    serial = catalog_archive(archive_path, jobs=1)
+    assert len(serial) == PAGES
+    assert all(error is None for _, error, _ in serial)
+    assert catalog_archive(archive_path, jobs=3) == serial
@@ -0,0 +1,104 @@
+"""
+Duplicate Detection Tests
+--dedup and --dedup-normalize must give the same catalog as a run that parses every file.
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONVERTER_DIR = REPO_ROOT / 'public' / 'converter'
+if str(CONVERTER_DIR) not in sys.path:
+    sys.path.insert(0, str(CONVERTER_DIR))
+
+import html_section_cataloger_deluxe as cataloger
+
+# Pages per locale: each copy comes this many files after its original, past any cache of recent results
+MIRROR_PAGES = 1100
+
+PAGE = '''<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{token}"><script nonce="{token}" src="/app.{build}.js?ver={build}"></script></head>
+<body>
+<section class="hero-section"><div class="inner"><h1>Page {index}</h1>{cards}</div></section>
+<div class="features-section"><ul>{items}</ul></div>
+</body></html>
+'''
+
+def page(index, token='a1', build='0f3e9c2d'):
+    return PAGE.format(index=index % 5, token=token, build=build, cards='<div class="card"></div>' * (index % 5),
+                       items='<li>x</li>' * (index % 3))
+
+@pytest.fixture(scope='module')
+def site(tmp_path_factory):
+    """Pages with byte-identical copies and copies that only differ in tokens, build hashes and whitespace."""
+    root = tmp_path_factory.mktemp('site')
+    for index in range(30):
+        (root / f"page-{index}.html").write_text(page(index))
+        if index % 3 == 0:
+            (root / f"copy-{index}.html").write_text(page(index))
+        if index % 4 == 0:
+            variant = page(index, token=f"t{index}", build='9a8b7c6d5e').replace('\n<section', '\n\n   <section')
+            (root / f"variant-{index}.html").write_text(variant)
+    return root
+
+def catalog_json(site, **options):
+    unique_sections = cataloger.catalog_sections(site, **options)
+    return json.dumps([cataloger.build_json_entry(key, data) for key, data in unique_sections.items()], sort_keys=True)
+
+@pytest.mark.parametrize('dedup, jobs', [
+    (cataloger.DEDUP_EXACT, 1),
+    (cataloger.DEDUP_EXACT, 2),
+    (cataloger.DEDUP_NORMALIZED, 1),
+    (cataloger.DEDUP_NORMALIZED, 2),
+])
+def test_dedup_matches_a_full_parse(site, capsys, dedup, jobs):
+    expected = catalog_json(site)
+    assert catalog_json(site, jobs=jobs, dedup=dedup) == expected
+    assert 'Reused the results of' in capsys.readouterr().out
+
+@pytest.fixture(scope='module')
+def mirror(tmp_path_factory):
+    """Two locale folders of the same 1100 pages, so every copy comes 1100 files after its original."""
+    root = tmp_path_factory.mktemp('mirror')
+    for locale in ('en', 'fr'):
+        (root / locale).mkdir()
+        for index in range(MIRROR_PAGES):
+            (root / locale / f"page-{index}.html").write_text(
+                f'<html><body><section class="hero"><h1>Page {index}</h1></section></body></html>')
+    return root
+
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_every_copy_is_reused_however_far_apart(mirror, jobs):
+    stats = cataloger.RunStats()
+    cataloger.catalog_sections(mirror, jobs=jobs, stats=stats, dedup=cataloger.DEDUP_EXACT)
+    assert stats.parsed_files == MIRROR_PAGES
+    assert stats.duplicate_files == MIRROR_PAGES
+
+def test_normalized_dedup_ignores_volatile_markup():
+    original = page(4).encode()
+    variant = page(4, token='other', build='1234abcd5678').replace('\n<section', '\n\n   <section').encode()
+    assert cataloger.content_digest(original) != cataloger.content_digest(variant)
+    assert (cataloger.content_digest(original, cataloger.DEDUP_NORMALIZED)
+            == cataloger.content_digest(variant, cataloger.DEDUP_NORMALIZED))
+    assert (cataloger.content_digest(page(3).encode(), cataloger.DEDUP_NORMALIZED)
+            != cataloger.content_digest(original, cataloger.DEDUP_NORMALIZED))
+
+def normalized_digest(html):
+    return cataloger.content_digest(html.encode(), cataloger.DEDUP_NORMALIZED)
+
+def test_normalization_only_masks_the_token_value():
+    original = normalized_digest('<meta name="csrf-token" content="a1"><input type="hidden" name="_token" value="a1">')
+    assert normalized_digest('<meta name="csrf-token" content="b2"><input type="hidden" name="_token" value="b2">') == original
+    assert normalized_digest('<meta name="csrf-token" content="a1"><input type="hidden" name="_wpnonce" value="a1">') != original
+    assert (normalized_digest('<meta name="csrf-token" class="x" content="a1"><input type="hidden" name="_token" value="a1">')
+            != original)
+
+def test_normalization_keeps_whitespace_in_scripts_pre_and_textarea():
+    original = normalized_digest('<div>\n  <script>var a = "x  y";</script>\n<pre> a\n b</pre><textarea>a  b</textarea></div>')
+    assert normalized_digest('<div> <script>var a = "x  y";</script> <pre> a\n b</pre><textarea>a  b</textarea></div>') == original
+    assert normalized_digest('<div>\n  <script>var a = "x y";</script>\n<pre> a\n b</pre><textarea>a  b</textarea></div>') != original
+    assert normalized_digest('<div>\n  <script>var a = "x  y";</script>\n<pre> a b</pre><textarea>a  b</textarea></div>') != original
+    assert normalized_digest('<div>\n  <script>var a = "x  y";</script>\n<pre> a\n b</pre><textarea>a b</textarea></div>') != original
\ No newline at end of file
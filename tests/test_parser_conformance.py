@@ -0,0 +1,95 @@
+"""
+Parser Conformance Tests
+Every parser backend, and streaming mode, must catalog the fixture corpus in
+tests/fixtures/conformance exactly like html.parser: same sections, attributes,
+element signatures and content hashes.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONVERTER_DIR = REPO_ROOT / 'public' / 'converter'
+if str(CONVERTER_DIR) not in sys.path:
+    sys.path.insert(0, str(CONVERTER_DIR))
+
+import html_section_cataloger_deluxe as cataloger
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures' / 'conformance'
+DOCUMENTS = sorted(FIXTURES_DIR.glob('*.html'))
+BACKENDS = [parser for parser in cataloger.PARSER_BACKENDS if parser != cataloger.DEFAULT_PARSER] + ['stream']
+
+# Broken markup a backend's tree builder recovers from differently than html.parser, so
+# check_parser_conformance() must report exactly these documents
+KNOWN_DIFFERENCES = {
+    ('divergent_unclosed_div.html', 'lxml'): "libxml2 doesn't close an open <div> at </section>",
+    ('divergent_stray_end_p.html', 'selectolax'): 'HTML5 turns a stray </p> into an empty <p>',
+    ('divergent_end_br.html', 'selectolax'): 'HTML5 turns </br> into <br>',
+}
+
+def require(parser):
+    """Skip the test when a backend's package isn't installed."""
+    if parser != 'stream' and parser not in cataloger.available_parsers():
+        pytest.skip(f"{parser} is not installed")
+
+def catalog(document, parser):
+    """(sections, error) for one document with a backend, or with 'stream' for streaming mode."""
+    if parser == 'stream':
+        results, error = cataloger.stream_html_file(document)
+        return results.get('sections', []), error
+    return cataloger.try_parse_html_file(document, parser)
+
+def conformance_cases():
+    """(document, backend) pairs, with the KNOWN_DIFFERENCES expected to fail."""
+    cases = []
+    for document in DOCUMENTS:
+        for parser in BACKENDS:
+            reason = KNOWN_DIFFERENCES.get((document.name, parser))
+            marks = [pytest.mark.xfail(strict=True, reason=reason)] if reason else []
+            cases.append(pytest.param(document, parser, marks=marks, id=f"{document.stem}-{parser}"))
+    return cases
+
+@pytest.mark.parametrize('document, parser', conformance_cases())
+def test_backend_matches_html_parser(document, parser):
+    require(parser)
+    reference, reference_error = catalog(document, cataloger.DEFAULT_PARSER)
+    sections, error = catalog(document, parser)
+    assert reference_error is None and error is None
+    assert reference, f"{document.name} has no sections to compare"
+    assert cataloger.describe_section_difference(reference, sections) is None
+    assert sections == reference
+
+@pytest.mark.parametrize('document', [document for document in DOCUMENTS
+                                      if not document.name.startswith('divergent_')], ids=lambda document: document.stem)
+def test_selectolax_find_all_matches_beautifulsoup(document):
+    # The benchmark harness collects sections with parse_document(...).find_all('section')
+    require('selectolax')
+    text, _ = cataloger.decode_html(document.read_bytes())
+    expected = cataloger.parse_document(text, cataloger.DEFAULT_PARSER)
+    actual = cataloger.parse_document(text, 'selectolax')
+    for name in ('section', None):
+        assert ([(element.name, element.get('class')) for element in actual.find_all(name)]
+                == [(element.name, element.get('class')) for element in expected.find_all(name)])
+
+def test_check_parser_conformance_names_the_differing_documents(capsys):
+    parsers = [cataloger.DEFAULT_PARSER] + [parser for parser in BACKENDS
+                                             if parser == 'stream' or parser in cataloger.available_parsers()]
+    differences = cataloger.check_parser_conformance(FIXTURES_DIR, parsers)
+    reported = {(Path(file_name).name, parser) for parser, differing in differences.items()
+                for file_name, _ in differing}
+    expected = {(name, parser) for name, parser in KNOWN_DIFFERENCES if parser in differences}
+    assert reported == expected
+    assert 'PARSER CONFORMANCE' in capsys.readouterr().out
+
+def test_declared_latin1_is_decoded_as_windows_1252():
+    sections, error = catalog(FIXTURES_DIR / 'latin1.html', cataloger.DEFAULT_PARSER)
+    assert error is None
+    assert [section['classes'] for section in sections] == [['menü-section', 'café'], ['événements-section']]
+
+def test_bom_and_crlf_do_not_change_the_catalog():
+    utf8, _ = catalog(FIXTURES_DIR / 'bom_crlf.html', cataloger.DEFAULT_PARSER)
+    utf16, _ = catalog(FIXTURES_DIR / 'utf16_bom.html', cataloger.DEFAULT_PARSER)
+    assert utf8
+    assert [dict(section, file=None) for section in utf8] == [dict(section, file=None) for section in utf16]
@@ -0,0 +1,28 @@
+"""
+Report File Name Tests
+Files that share a name in different folders must be told apart in the reports.
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONVERTER_DIR = REPO_ROOT / 'public' / 'converter'
+if str(CONVERTER_DIR) not in sys.path:
+    sys.path.insert(0, str(CONVERTER_DIR))
+
+import html_section_cataloger_deluxe as cataloger
+
+def test_colliding_names_are_shown_relative_to_the_root(tmp_path):
+    for folder, extra in (('en', '<p>only here</p>'), ('fr', '')):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / 'index.html').write_text(
+            f'<html><body><section class="hero"><h1>Hi</h1>{extra}</section></body></html>')
+    (tmp_path / 'about.html').write_text('<html><body><section class="hero"><h1>Hi</h1></section></body></html>')
+
+    unique_sections = cataloger.catalog_sections(tmp_path)
+    report = '\n'.join(cataloger.iter_report_lines(unique_sections, show_details=True, root_directory=str(tmp_path)))
+    assert '"en/index.html"' in report and '"fr/index.html"' in report
+    assert '"about.html"' in report
+    assert 'Found in: "en/index.html"' in report
+    assert '"index.html"' not in report
\ No newline at end of file
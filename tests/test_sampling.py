@@ -0,0 +1,40 @@
+"""
+Sampling Tests
+--sample must stop about as soon with worker processes as without.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONVERTER_DIR = REPO_ROOT / 'public' / 'converter'
+if str(CONVERTER_DIR) not in sys.path:
+    sys.path.insert(0, str(CONVERTER_DIR))
+
+import html_section_cataloger_deluxe as cataloger
+
+WINDOW = 20
+
+@pytest.fixture(scope='module')
+def site(tmp_path_factory):
+    """Pages that all share one template, so the sample saturates after its first window."""
+    root = tmp_path_factory.mktemp('site')
+    for index in range(600):
+        (root / f"page-{index}.html").write_text(
+            f'<html><body><section class="hero"><h1>Page {index}</h1></section></body></html>')
+    return root
+
+def sampled_files(site, jobs):
+    html_files = sorted(str(path) for path in site.glob('*.html'))
+    sampler = cataloger.SaturationSampler(html_files, site, window=WINDOW)
+    cataloger.catalog_sections(site, jobs, html_files=sampler, catalogs={'sections': sampler},
+                               lookahead=cataloger.SAMPLE_LOOKAHEAD)
+    assert sampler.stop_reason
+    return sampler.files_done
+
+def test_parallel_sample_stops_with_the_serial_one(site):
+    serial = sampled_files(site, jobs=1)
+    assert serial < 2 * WINDOW
+    assert serial <= sampled_files(site, jobs=3) <= serial + 3 * cataloger.SAMPLE_LOOKAHEAD
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Near-Duplicate Clustering Tests
+find_similar_sections() must not depend on the order variants land in an LSH bucket,
+and must not compare every pair in a bucket.
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CONVERTER_DIR = REPO_ROOT / 'public' / 'converter'
+if str(CONVERTER_DIR) not in sys.path:
+    sys.path.insert(0, str(CONVERTER_DIR))
+
+import html_section_cataloger_deluxe as cataloger
+
+def section_entry(classes, tag):
+    """A catalog entry with a single content variant made of one <tag> element."""
+    return {
+        'classes': classes,
+        'variants': [{
+            'content_hash': tag,
+            'content_analysis': {'element_signatures': [cataloger.SIGNATURES.intern(tag, (), ())],
+                                 'total_elements': 1, 'unique_elements': 1},
+            'occurrences': [],
+            'first_seen_in': f"{tag}.html"
+        }]
+    }
+
+def cluster_hashes(unique_sections, **options):
+    clusters = cataloger.find_similar_sections(unique_sections, **options)['clusters']
+    return [sorted(variant['content_hash'] for variant in cluster) for cluster in clusters]
+
+def test_every_cluster_in_a_bucket_is_compared(monkeypatch):
+    # One band of 3 rows over 5-value MinHashes puts all three variants in the same bucket.
+    # The first one is only 60% like the others, which agree on every value.
+    minhashes = {'first': (1, 1, 1, 8, 9), 'second': (1, 1, 1, 5, 6), 'third': (1, 1, 1, 5, 6)}
+    unique_sections = {tag: section_entry([tag], tag) for tag in minhashes}
+    by_shingles = {frozenset(cataloger.section_shingles([cataloger.SIGNATURES.intern(tag, (), ())])): minhash
+                   for tag, minhash in minhashes.items()}
+    monkeypatch.setattr(cataloger, 'compute_minhash', lambda shingles, permutations: by_shingles[frozenset(shingles)])
+    monkeypatch.setattr(cataloger, 'lsh_band_layout', lambda num_perm, threshold: (1, 3))
+
+    assert cluster_hashes(unique_sections, threshold=0.8, num_perm=5) == [['second', 'third']]
+
+def test_identical_content_under_different_classes_is_one_cluster():
+    unique_sections = {'card': section_entry(['card'], 'article'), 'tile': section_entry(['tile'], 'article'),
+                       'other': section_entry(['other'], 'aside')}
+    assert cluster_hashes(unique_sections) == [['article', 'article']]
+
+def test_comparisons_stay_linear_in_a_bucket_of_similar_variants(monkeypatch):
+    # 2000 variants that all land in one bucket and all clear the threshold: an all-pairs
+    # walk makes ~2M comparisons, a walk over the clusters seen so far one per variant.
+    count = 2000
+    tags = [f"tag-{index}" for index in range(count)]
+    unique_sections = {tag: section_entry([tag], tag) for tag in tags}
+    by_shingles = {frozenset(cataloger.section_shingles([cataloger.SIGNATURES.intern(tag, (), ())])): (1, 1, 1, 1, index)
+                   for index, tag in enumerate(tags)}
+    monkeypatch.setattr(cataloger, 'compute_minhash', lambda shingles, permutations: by_shingles[frozenset(shingles)])
+    monkeypatch.setattr(cataloger, 'lsh_band_layout', lambda num_perm, threshold: (1, 3))
+    comparisons = []
+    similarity = cataloger.minhash_similarity
+    monkeypatch.setattr(cataloger, 'minhash_similarity',
+                        lambda signature, other: comparisons.append(1) or similarity(signature, other))
+
+    assert cluster_hashes(unique_sections, threshold=0.8, num_perm=5) == [sorted(tags)]
+    assert 0 < len(comparisons) <= count
\ No newline at end of file